@@ -1,7 +1,8 @@
 # Save as tiltfire_ud_with_sfx_reload.py
 # Run: pip install pygame numpy ; python tiltfire_ud_with_sfx_reload.py
 
-import math, random, sys, collections
+import math, random, sys, collections, os, struct, threading, time, atexit, argparse, json, hashlib, gc, array
+import operator, zlib
 import pygame
 from pygame.math import Vector2
 
@@ -55,12 +56,111 @@ BOSS_FIRE_COOLDOWN_BASE = 1.0
 BOSS_LEARN_WINDOW = 40
 BOSS_VIBRATE_TIME = 0.14
 BOSS_VIBRATE_MAG = 8.0
+# Per-difficulty boss multipliers and per-personality behaviour (searched by --tune)
+DIFFICULTY_PARAMS = {
+    "Easy":   {"health": 0.8, "speed": 0.9, "aggression": 0.85, "pattern_rate": 0.6},
+    "Normal": {"health": 1.0, "speed": 1.0, "aggression": 1.0, "pattern_rate": 0.8},
+    "Hard":   {"health": 1.4, "speed": 1.2, "aggression": 1.2, "pattern_rate": 1.0},
+}
+PERSONALITY_PARAMS = {
+    "Sniper":    {"preferred_dist": 340, "retreat_bias": 0.55, "fire_bias": 0.45, "fake_charge_chance": 0.25},
+    "Brawler":   {"preferred_dist": 220, "retreat_bias": 0.25, "fire_bias": 0.85, "fake_charge_chance": 0.25},
+    "Trickster": {"preferred_dist": 280, "retreat_bias": 0.45, "fire_bias": 0.65, "fake_charge_chance": 0.25},
+    "Adaptive":  {"preferred_dist": 260, "retreat_bias": 0.4, "fire_bias": 0.7, "fake_charge_chance": 0.25},
+    "Planner":   {"preferred_dist": 300, "retreat_bias": 0.3, "fire_bias": 0.8, "fake_charge_chance": 0.25},
+}
+# Planner personality (Hard only): picks movement and shot charge by simulating rollouts
+PLANNER_HORIZON = 0.75          # seconds simulated per rollout
+PLANNER_STEP = 1.0 / 20.0       # rollout tick
+PLANNER_REPLAN_INTERVAL = 0.25  # seconds between plans
+PLANNER_BUDGET_MS = 1.0         # rollout compute per frame; unfinished plans resume next frame
+PLANNER_CHUNK = 18              # candidates evaluated per budget check
+PLANNER_DIRECTIONS = 8          # compass directions tried (plus standing still)
+PLANNER_CHARGES = (0.0, 0.25, 0.55, 0.85)  # 0 = hold fire
+# Danger field (boss dodging, needs numpy): predicted player-shot paths over the boss half
+DANGER_CELL = 20                 # px per grid cell
+DANGER_HORIZON = 1.0             # seconds of each shot's path that get stamped
+DANGER_RESTAMP_INTERVAL = 0.2    # redraw a shot's stamp from its current position this often
+DANGER_THRESHOLD = 0.3           # danger along the current heading that triggers a dodge
+DANGER_LOOKAHEAD = (30.0, 70.0)  # px ahead sampled when scoring a direction
+DANGER_REACTION = {"Easy": 0.5, "Normal": 0.35, "Hard": 0.2}  # seconds before the boss notices a shot
+# Arena layouts (--arena): static obstacles, pillars ("pillar", x, y, r) ricochet shots and
+# barriers ("barrier", x1, y1, x2, y2, r) absorb them; collisions go through a distance field
+ARENA_LAYOUTS = {
+    "Open": (),
+    "Pillars": (("pillar", 250, 140, 30), ("pillar", 750, 140, 30),
+                ("pillar", 250, 480, 34), ("pillar", 750, 480, 34)),
+    "Barriers": (("barrier", 150, 215, 330, 215, 10), ("barrier", 670, 215, 850, 215, 10),
+                 ("barrier", 400, 385, 600, 385, 10),
+                 ("barrier", 110, 560, 250, 560, 10), ("barrier", 750, 560, 890, 560, 10)),
+    "Bunker": (("pillar", 180, 200, 26), ("pillar", 820, 200, 26),
+               ("barrier", 330, 400, 440, 440, 10), ("barrier", 560, 440, 670, 400, 10),
+               ("pillar", 500, 610, 22)),
+}
+ARENA_LAYOUT = "Open"
+OBSTACLE_COLOR = (62, 66, 80)
+SDF_CELL = 8                     # px between distance-field samples
+SDF_MIN_STEP = 1.0               # shortest sphere-tracing step along a shot's path (px)
+SDF_CONTACT = 0.5                # clearance (px) that counts as touching an obstacle
+OBSTACLE_BOUNCE = 0.85           # share of its speed a shot keeps off a pillar
+OBSTACLE_MAX_BOUNCES = 2         # contacts after this many ricochets absorb the shot
+OBSTACLE_AVOID_DIST = 60.0       # boss soft avoidance reach (as for the center wall)
+# Bullet-hell phase (needs numpy): below BULLET_HELL_HEALTH of max health the boss stops single
+# shots and cycles through emitter patterns fired from a preallocated pool. Volley rates are per
+# second at pattern_rate 1.0 (DIFFICULTY_PARAMS scales them).
+BULLET_HELL_HEALTH = 0.3
+BULLET_POOL_SIZE = 4096          # live bullets; volleys past this are cut short
+BULLET_LIFETIME = 6.0
+BULLET_PATTERN_PAUSE = 0.6       # seconds of quiet between patterns
+BULLET_PATTERNS = (
+    {"kind": "spiral", "duration": 4.0, "rate": 40.0, "count": 8, "speed": 190.0, "spin": 1.7,
+     "radius": 6, "damage": 2.0, "color": (255, 150, 90)},
+    {"kind": "radial", "duration": 3.0, "rate": 4.0, "count": 64, "speed": 160.0,
+     "radius": 7, "damage": 3.0, "color": (255, 90, 130)},
+    {"kind": "fan", "duration": 3.0, "rate": 8.0, "count": 13, "spread": 1.0, "speed": 300.0,
+     "radius": 5, "damage": 2.0, "color": (255, 220, 90)},
+    {"kind": "wall", "duration": 4.0, "rate": 2.0, "spacing": 26.0, "gap": 150.0, "speed": 150.0,
+     "radius": 8, "damage": 4.0, "color": (190, 110, 255)},
+)
+# --bench-bullet-hell: the pattern_rate it runs at (whatever the difficulty), and what it must sustain
+BULLET_BENCH_STRESS = 2.0
+BULLET_BENCH_MIN_RATE = 300.0    # bullets spawned per second, pauses included
+BULLET_BENCH_MIN_REPLANS = 1.0   # boss heading changes per second: it must keep thinking in the phase
+# Time scale: matches step a fixed tick; each presented frame runs as many ticks as the scale asks for
+TICK_DT = 1.0 / FPS
+TIME_SCALES = (0.25, 0.5, 1.0, 2.0, 8.0, float("inf"))  # inf = as fast as the simulation runs
+MAX_TICKS_PER_FRAME = 64         # finite speeds drop backlog past this instead of spiralling
+MAX_SPEED_FRAME_MS = 12.0        # simulation time per presented frame at max speed
+# AI level of detail: boss decisions ("think") run slower than movement ("act")
+BOSS_THINK_HZ = 20.0             # 0 = think every tick
+BOSS_THINK_BUDGET_MS = 2.0       # think time allowed per frame, shared by every arena
+BOSS_THINK_MAX_DEFER = 0.25      # a boss starved this long thinks regardless of the budget
+# --check-ai-lod: mean differences from thinking every tick that still count as the same game
+AI_LOD_MARGINS = {"duration": 2.0, "player_hp": 2.0, "boss_hp_frac": 0.05, "boss_shots": 0.5,
+                  "boss_fake_charges": 0.5, "boss_y": 15.0}
+AI_LOD_BATCH = 64                # arenas sharing one think budget in the budgeted run
+AI_LOD_BUDGET_MS = 1.0           # deliberately tight budget for those batches, so thinks get deferred
+AI_LOD_RESAMPLES = 2000          # bootstrap resamples per confidence interval
+# Difficulty tuner: player win rate wanted against each scripted skill level, and mean match length
+TUNER_SKILLS = (0.3, 0.6, 0.9)
+TUNER_TARGETS = {
+    "Easy":   {"win_rate": (0.6, 0.85, 0.97), "duration": 30.0},
+    "Normal": {"win_rate": (0.35, 0.65, 0.85), "duration": 40.0},
+    "Hard":   {"win_rate": (0.15, 0.4, 0.7), "duration": 55.0},
+}
+TUNER_BOUNDS = {
+    "health": (0.5, 2.0), "speed": (0.6, 1.6), "aggression": (0.6, 1.6), "pattern_rate": (0.3, 1.6),
+    "preferred_dist": (180, 380), "retreat_bias": (0.1, 0.8), "fire_bias": (0.3, 0.95),
+    "fake_charge_chance": (0.0, 0.5),
+}
+TUNER_MATCH_SECONDS = 180.0      # matches still running after this count as player losses
 # -------- Boss AI States --------
 BOSS_STATE_APPROACH = "approach"
 BOSS_STATE_STRAFE = "strafe"
 BOSS_STATE_RETREAT = "retreat"
 BOSS_STATE_CHARGE = "charge"
 BOSS_STATE_POKE = "poke"
+BOSS_STATES = (BOSS_STATE_APPROACH, BOSS_STATE_STRAFE, BOSS_STATE_RETREAT, BOSS_STATE_CHARGE, BOSS_STATE_POKE)
 
 
 # Boss magazine uses same size by default; per-bullet reload same as player
@@ -81,6 +181,50 @@ HUD_COLOR = (200, 200, 200)
 PROJECTILE_GLOW = (180, 160, 255)
 PLAYER_HIT_TINT = (255, 180, 180)
 FONT_NAME = "Arial"
+# Audio voice pool: effects by priority, with at most `voices` starts per `window` seconds
+AUDIO_VOICES = 8                 # mixer channels reserved for effects
+AUDIO_BASE_VOLUME = 0.7          # headroom so coalesced repeats can play louder
+AUDIO_COALESCE_GAIN = 0.25       # extra volume per merged repeat
+AUDIO_COALESCE_WINDOW = 0.05     # repeats this soon after a play join it instead of starting a voice
+AUDIO_PAN = True                 # pan effects by their x position
+SFX_PARAMS = {
+    "hit":         {"priority": 3, "voices": 3, "window": 0.15},
+    "player_shot": {"priority": 2, "voices": 2, "window": 0.1},
+    "boss_shot":   {"priority": 2, "voices": 2, "window": 0.1},
+    "reload":      {"priority": 1, "voices": 1, "window": 0.12},
+    "empty_click": {"priority": 0, "voices": 1, "window": 0.2},
+}
+# Frame pacing: GC control (--gc managed) and the stutter detector (--stutter-log)
+GC_MATCH_THRESHOLD = 50000       # gen0 threshold while a match runs in managed mode
+STUTTER_THRESHOLD = 1.25         # frames longer than this many budgets count as stutters
+STUTTER_HISTORY = 36000          # frame times kept for percentiles (10 minutes at 60 FPS)
+# Soak mode (--soak): unattended restart loop with memory sampling at every match boundary
+SOAK_WARMUP_MATCHES = 20         # caches, fonts and pools settle; growth is measured after these
+SOAK_MIN_MEASURED = 10           # matches after warm-up needed before the soak gives a verdict
+SOAK_TRACE_FRAMES = 4            # tracemalloc frames kept, enough to see the pilot above library calls
+SOAK_UI_FRAMES = 3               # frames each menu is drawn before the pilot clicks
+SOAK_MAX_RSS_GROWTH = 16 * 1024  # allowed resident-set slope, bytes per match
+SOAK_MAX_TRACED_GROWTH = 512     # allowed tracemalloc slope, bytes per match
+SOAK_MAX_OBJECT_GROWTH = 0.5     # allowed live-object slope per type, objects per match
+SOAK_REPORT_TOP = 10
+RENDER_BACKEND = "surface"  # "texture" draws through pygame._sdl2 Renderer/Texture
+# Dynamic resolution (--dynamic-resolution): the arena renders smaller when frames run over budget
+DRS_MIN_SCALE = 0.5
+DRS_STEP = 0.1
+DRS_HIGH = 0.85          # fraction of the 1/FPS frame budget that triggers a step down
+DRS_LOW = 0.55           # step back up once frames stay under this fraction
+DRS_SETTLE_FRAMES = 30   # frames to wait after each change before judging again
+# Adaptive effects quality: rows from full to cheapest. Only cosmetic effects degrade;
+# players, bosses, projectile cores and the HUD always draw in full.
+EFFECTS_LEVELS = [
+    {"particle_frac": 1.0, "max_particles": None, "glow_min_radius": 0, "hit_flash": True},
+    {"particle_frac": 0.6, "max_particles": 240, "glow_min_radius": 8, "hit_flash": True},
+    {"particle_frac": 0.35, "max_particles": 120, "glow_min_radius": 14, "hit_flash": False},
+    {"particle_frac": 0.15, "max_particles": 48, "glow_min_radius": 22, "hit_flash": False},
+]
+FX_HIGH = 0.75           # effects shed before resolution drops (DRS_HIGH)
+FX_LOW = 0.45
+FX_SETTLE_FRAMES = 45
 
 # Middle divider flash
 DIVIDER_FLASH_DURATION = 1.5   # seconds
@@ -89,6 +233,15 @@ DIVIDER_COLOR = (180, 180, 180)
 DIVIDER_THICKNESS = 4
 divider_flash_timer = 0.0
 
+# Telemetry (gameplay event stream, drained to disk by a background thread)
+TELEMETRY_RING_SIZE = 8192                 # events buffered between drains
+TELEMETRY_FLUSH_INTERVAL = 0.5             # seconds between writer wakeups
+TELEMETRY_FILE_MAX_BYTES = 4 * 1024 * 1024 # rotate after this many bytes
+TELEMETRY_MAX_FILES = 16                   # oldest files beyond this are deleted
+
+# Training dataset recorder (dense per-tick columns, needs numpy)
+DATASET_CHUNK_TICKS = 4096                 # ticks per shard (~68 s at 60 FPS)
+
 
 
 pygame.init()
@@ -98,16 +251,40 @@ try:
 except Exception:
     print("Warning: audio mixer initialization failed — sounds disabled")
 
-screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
+screen = None  # created by init_display(); headless runs never open a window
 clock = pygame.time.Clock()
 font = pygame.font.SysFont(FONT_NAME, 18)
 big_font = pygame.font.SysFont(FONT_NAME, 36)
 title_font = pygame.font.SysFont(FONT_NAME, 48)
 
+
+
+renderer = None  # SurfaceRenderer or TextureRenderer, created by init_display()
+
+
+def init_display(backend=RENDER_BACKEND, flags=0):
+    """
+    Opens the window with the requested backend ("surface", "texture", or
+    "texture-software" for SDL's software renderer). The texture backend falls
+    back to the surface renderer if pygame._sdl2 is unavailable or fails to start.
+    flags (pygame.SCALED, pygame.FULLSCREEN) apply to the surface backend; with
+    SCALED the window scales on the GPU while game coordinates stay 1000x700.
+    """
+    global screen, renderer
+    if renderer is None:
+        if backend.startswith("texture"):
+            try:
+                renderer = TextureRenderer(accelerated=0 if backend == "texture-software" else -1)
+            except Exception as exc:
+                print(f"Warning: texture renderer unavailable ({exc}) — using the surface renderer")
+        if renderer is None:
+            renderer = SurfaceRenderer(flags)
+        screen = renderer.surface
+    return screen
+
+
 # Globals for UI
-last_frame_surface = None
-restart_btn = None
-quit_btn = None
+last_frame_surface = None  # final frame of the match that just ended, handed to the end screen
 
 # Optional: numpy for sound generation
 try:
@@ -137,18 +314,142 @@ def make_sine_sound(freq=440.0, duration=0.08, volume=0.28, sample_rate=44100):
     except Exception:
         return None
 
+class AudioManager:
+    """
+    Voice pool over AUDIO_VOICES reserved mixer channels. Effects requested
+    during a frame are queued and started once per frame by flush(): repeats of
+    one effect merge into a single louder play panned to their mean x (and into
+    the effect's previous voice if that started within AUDIO_COALESCE_WINDOW),
+    each effect keeps to its SFX_PARAMS voice budget per window, and with every
+    channel busy a new effect may only steal a voice of lower priority.
+    """
+
+    def __init__(self, sounds, voices=AUDIO_VOICES):
+        self.sounds = {name: snd for name, snd in sounds.items() if snd is not None}
+        self.channels = []
+        if self.sounds and pygame.mixer.get_init():
+            pygame.mixer.set_num_channels(max(voices, pygame.mixer.get_num_channels()))
+            pygame.mixer.set_reserved(voices)  # stray Sound.play() calls can't steal these
+            self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+        self.voices = [None] * len(self.channels)  # (priority, started) of what each channel plays
+        self.recent = {name: collections.deque() for name in self.sounds}
+        self.last = {}     # name -> (channel index, started, volume) of its latest voice
+        self.pending = {}  # name -> [requests, sum of x, requests with x]
+        self.coalesced = 0
+        self.dropped = 0
+
+    def play(self, name, x=None):
+        if not self.channels or name not in self.sounds:
+            return
+        req = self.pending.get(name)
+        if req is None:
+            req = self.pending[name] = [0, 0.0, 0]
+        req[0] += 1
+        if x is not None:
+            req[1] += x
+            req[2] += 1
+
+    def flush(self, now=None):
+        if not self.pending:
+            return
+        now = time.perf_counter() if now is None else now
+        for name in sorted(self.pending, key=lambda n: -SFX_PARAMS[n]["priority"]):
+            count, sum_x, n_x = self.pending[name]
+            self._start(name, count, sum_x / n_x if n_x else None, now)
+        self.pending.clear()
+
+    def _start(self, name, count, x, now):
+        params = SFX_PARAMS[name]
+        sound = self.sounds[name]
+        self.coalesced += count - 1
+        volume = min(1.0, AUDIO_BASE_VOLUME * (1.0 + AUDIO_COALESCE_GAIN * (count - 1)))
+
+        last = self.last.get(name)
+        if last is not None and now - last[1] < AUDIO_COALESCE_WINDOW:
+            ch = self.channels[last[0]]
+            if ch.get_busy() and ch.get_sound() is sound:
+                volume = min(1.0, last[2] * (1.0 + AUDIO_COALESCE_GAIN * count))
+                self._set_volume(ch, volume, x)
+                self.last[name] = (last[0], last[1], volume)
+                self.coalesced += 1
+                return
+
+        recent = self.recent[name]
+        while recent and now - recent[0] > params["window"]:
+            recent.popleft()
+        if len(recent) >= params["voices"]:
+            self.dropped += count
+            return
+
+        index = None
+        for i, ch in enumerate(self.channels):
+            if not ch.get_busy():
+                index = i
+                break
+        if index is None:
+            victims = [i for i, v in enumerate(self.voices) if v is not None and v[0] < params["priority"]]
+            if not victims:
+                self.dropped += count
+                return
+            index = min(victims, key=lambda i: self.voices[i])  # lowest priority, oldest first
+
+        ch = self.channels[index]
+        ch.play(sound)
+        self._set_volume(ch, volume, x)  # after play(): play() resets the channel volume
+        self.voices[index] = (params["priority"], now)
+        self.last[name] = (index, now, volume)
+        recent.append(now)
+
+    @staticmethod
+    def _set_volume(ch, volume, x):
+        if x is None or not AUDIO_PAN:
+            ch.set_volume(volume)
+            return
+        pan = clamp(x / SCREEN_W, 0.0, 1.0) * math.pi / 2  # equal-power pan
+        ch.set_volume(volume * math.cos(pan), volume * math.sin(pan))
+
+
 # create some sounds (may be None if numpy isn't installed)
-player_shot_sound = make_sine_sound(900.0, 0.07, 0.28)
-boss_shot_sound = make_sine_sound(520.0, 0.10, 0.26)
-hit_sound = make_sine_sound(1400.0, 0.06, 0.36)
-reload_sound = make_sine_sound(220.0, 0.10, 0.22)
-empty_click_sound = make_sine_sound(160.0, 0.05, 0.12)
+audio = AudioManager({
+    "player_shot": make_sine_sound(900.0, 0.07, 0.28),
+    "boss_shot": make_sine_sound(520.0, 0.10, 0.26),
+    "hit": make_sine_sound(1400.0, 0.06, 0.36),
+    "reload": make_sine_sound(220.0, 0.10, 0.22),
+    "empty_click": make_sine_sound(160.0, 0.05, 0.12),
+})
+
+# headless simulations turn this off so batch runs stay silent
+sfx_enabled = True
+
+
+def play_sfx(name, x=None):
+    """Queues an effect (SFX_PARAMS name) at screen x; the audio manager starts it at the end of the frame."""
+    if sfx_enabled:
+        audio.play(name, x)
 
 
 def clamp(x, a, b):
     return max(a, min(b, x))
 
 
+def tuned(table, row, overrides=None):
+    """One row of a parameter table with any "Row.key" overrides applied."""
+    values = dict(table[row])
+    if overrides:
+        for key in values:
+            values[key] = overrides.get(f"{row}.{key}", values[key])
+    return values
+
+
+def flat_tuning(overrides=None):
+    """Every "Row.key" of DIFFICULTY_PARAMS / PERSONALITY_PARAMS with any overrides applied."""
+    flat = {}
+    for table in (DIFFICULTY_PARAMS, PERSONALITY_PARAMS):
+        for row in table:
+            flat.update({f"{row}.{key}": value for key, value in tuned(table, row, overrides).items()})
+    return flat
+
+
 def blur_surface(surf, amt=6):
     if amt <= 0:
         return surf.copy()
@@ -158,7 +459,570 @@ def blur_surface(surf, amt=6):
     surf_blur = pygame.transform.smoothscale(surf_small, (surf.get_width(), surf.get_height()))
     return surf_blur
 
+
+# ---------- Telemetry ----------
+# Event codes (record field meaning in a, b, c, d)
+TEV_MATCH_START = 1    # a = difficulty index
+TEV_MATCH_END = 2      # a = 1 victory / 0 defeat, b = player hp, c = boss hp
+TEV_SHOT = 3           # a = charge, b = bullets_used, c = damage, d = ammo left
+TEV_HIT = 4            # a = damage, b = x, c = y, d = target hp after hit
+TEV_RELOAD_START = 5   # a = ammo
+TEV_RELOAD_DONE = 6    # a = ammo
+TEV_BOSS_STATE = 7     # a = old state index, b = new state index
+TEV_FAKE_CHARGE = 8
+TEV_PANIC = 9          # a = 1 entering / 0 leaving, b = ammo
+TEV_RETREAT = 10       # a = reset_duration
+TEV_AGGRESSION = 11    # a = aggression, b = observed player accuracy
+TEV_STUTTER = 12       # a = frame ms, b = STUTTER_CAUSES index, c = gc ms, d = culprit's excess ms
+TEV_BOSS_PHASE = 13    # a = boss hp as the bullet-hell phase starts
+
+ACTOR_PLAYER = 0
+ACTOR_BOSS = 1
+
+# time (perf_counter), code, actor, 2 pad bytes, 4 float fields -> 28 bytes on disk
+TELEMETRY_RECORD = struct.Struct("<dBBxxffff")
+TELEMETRY_MAGIC = b"TFTEL001"
+
+
+class Telemetry:
+    """
+    Gameplay event recorder. emit() packs a fixed-size record into a preallocated
+    ring buffer; a daemon thread drains the ring to rotating binary files, so the
+    game loop never touches the disk. If the writer falls behind, events are dropped
+    (and counted) rather than blocking a frame.
+    """
+
+    def __init__(self, capacity=TELEMETRY_RING_SIZE):
+        self.enabled = False
+        self.capacity = capacity
+        self.dropped = 0
+        self._rec = TELEMETRY_RECORD
+        self._ring = bytearray(capacity * self._rec.size)
+        self._head = 0  # events written (game thread only)
+        self._tail = 0  # events drained (writer thread only)
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._file = None
+        self.directory = None
+
+    def start(self, directory):
+        if self.enabled:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._session = time.strftime("%Y%m%d-%H%M%S")
+        self._file_index = 0
+        self._open_file()
+        self._stopping = False
+        self.enabled = True
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout=2.0)
+
+    def emit(self, code, actor=ACTOR_PLAYER, a=0.0, b=0.0, c=0.0, d=0.0):
+        if not self.enabled:
+            return
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return
+        self._rec.pack_into(self._ring, (head % self.capacity) * self._rec.size,
+                            time.perf_counter(), code, actor, a, b, c, d)
+        self._head = head + 1
+        if head + 1 - self._tail >= self.capacity // 2:
+            self._wake.set()
+
+    # ---- writer thread ----
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(TELEMETRY_FLUSH_INTERVAL)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+        self._file.close()
+
+    def _drain(self):
+        head = self._head
+        count = head - self._tail
+        if count <= 0:
+            return
+        size = self._rec.size
+        start = self._tail % self.capacity
+        first = min(count, self.capacity - start)
+        view = memoryview(self._ring)
+        self._file.write(view[start * size:(start + first) * size])
+        if count > first:
+            self._file.write(view[:(count - first) * size])
+        self._tail = head
+        self._file.flush()
+        if self._file.tell() >= TELEMETRY_FILE_MAX_BYTES:
+            self._file.close()
+            self._file_index += 1
+            self._open_file()
+
+    def _open_file(self):
+        name = f"telemetry-{self._session}-{self._file_index:04d}.bin"
+        self._file = open(os.path.join(self.directory, name), "wb")
+        self._file.write(TELEMETRY_MAGIC)
+        old = sorted(f for f in os.listdir(self.directory) if f.startswith("telemetry-") and f.endswith(".bin"))
+        for f in old[:-TELEMETRY_MAX_FILES]:
+            try:
+                os.remove(os.path.join(self.directory, f))
+            except OSError:
+                pass
+
+
+def read_telemetry(path):
+    """Yields (time, code, actor, a, b, c, d) tuples from one telemetry file."""
+    with open(path, "rb") as f:
+        if f.read(len(TELEMETRY_MAGIC)) != TELEMETRY_MAGIC:
+            raise ValueError(f"{path}: not a telemetry file")
+        data = f.read()
+    usable = len(data) - len(data) % TELEMETRY_RECORD.size
+    yield from TELEMETRY_RECORD.iter_unpack(data[:usable])
+
+
+telemetry = Telemetry()
+
+
+# ---------- Training dataset recorder ----------
+# One float32 value per column per tick. Shards are saved as (columns, ticks) arrays,
+# so every column is a contiguous row that np.load(mmap_mode="r") can hand out as-is.
+DATASET_COLUMNS = (
+    "match", "tick", "dt",
+    # player state
+    "player_x", "player_y", "player_vx", "player_vy", "player_input_mag",
+    "player_charging", "player_charge", "player_health", "player_ammo",
+    "player_reloading", "player_reload_timer", "player_hit_timer",
+    # boss state
+    "boss_x", "boss_y", "boss_vx", "boss_vy", "boss_target_vx", "boss_target_vy",
+    "boss_commit_x", "boss_commit_y", "boss_health", "boss_ammo", "boss_reloading",
+    "boss_state", "boss_state_timer", "boss_aggression", "boss_panic", "boss_fake_charging",
+    "boss_reset_duration", "boss_player_vx", "boss_player_vy",
+    # projectile summary
+    "proj_player_count", "proj_boss_count",
+    "threat_dx", "threat_dy", "threat_vx", "threat_vy", "threat_radius",  # nearest boss shot, relative to player
+    "shot_dx", "shot_dy", "shot_vx", "shot_vy", "shot_radius",            # nearest player shot, relative to boss
+    # human action
+    "act_move_x", "act_move_y", "act_aim_x", "act_aim_y", "act_charging", "act_fire",
+)
+
+
+class DatasetRecorder:
+    """
+    Records Player/Boss state, a projectile summary and the human's action every tick
+    into a preallocated (columns, ticks) float32 chunk. Full chunks are handed to a
+    writer thread and the recorder switches to its second buffer, so recording never
+    allocates or blocks per tick.
+    """
+
+    def __init__(self, directory, chunk_ticks=DATASET_CHUNK_TICKS):
+        if np is None:
+            raise RuntimeError("dataset recording needs numpy")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_ticks = chunk_ticks
+        self._buffers = [np.zeros((len(DATASET_COLUMNS), chunk_ticks), dtype=np.float32) for _ in range(2)]
+        self._active = 0
+        self._n = 0
+        self._writer = None
+        self.shards = []
+        self.match = -1
+        self.tick = 0
+        self._col = 0
+        atexit.register(self.close)
+
+    def begin_match(self):
+        self.match += 1
+        self.tick = 0
+
+    def record(self, dt, player, boss, projectiles, move_dir, aim_target, fired):
+        self._col = 0
+        put = self._put
+        put(self.match)
+        put(self.tick)
+        put(dt)
+
+        put(player.pos.x)
+        put(player.pos.y)
+        put(player.vel.x)
+        put(player.vel.y)
+        put(player.input_mag)
+        put(player.charging)
+        put(player.charge)
+        put(player.health)
+        put(player.ammo)
+        put(player.reloading)
+        put(player.reload_timer)
+        put(player.hit_timer)
+
+        put(boss.pos.x)
+        put(boss.pos.y)
+        put(boss.vel.x)
+        put(boss.vel.y)
+        put(boss.target_vel.x)
+        put(boss.target_vel.y)
+        put(boss.committed_dir.x)
+        put(boss.committed_dir.y)
+        put(boss.health)
+        put(boss.ammo)
+        put(boss.reloading)
+        put(BOSS_STATES.index(boss.state))
+        put(boss.state_timer)
+        put(boss.aggression)
+        put(boss.panic_mode)
+        put(boss.is_fake_charging)
+        put(boss.reset_duration)
+        put(boss.player_velocity.x)
+        put(boss.player_velocity.y)
+
+        n_player = n_boss = 0
+        threat = shot = None
+        threat_d = shot_d = float("inf")
+        for p in projectiles:
+            if p.owner == "boss":
+                n_boss += 1
+                d = p.pos.distance_squared_to(player.pos)
+                if d < threat_d:
+                    threat, threat_d = p, d
+            else:
+                n_player += 1
+                d = p.pos.distance_squared_to(boss.pos)
+                if d < shot_d:
+                    shot, shot_d = p, d
+        put(n_player)
+        put(n_boss)
+        for proj, origin in ((threat, player.pos), (shot, boss.pos)):
+            if proj is None:
+                for _ in range(5):
+                    put(0.0)
+            else:
+                put(proj.pos.x - origin.x)
+                put(proj.pos.y - origin.y)
+                put(proj.vel.x)
+                put(proj.vel.y)
+                put(proj.radius)
+
+        put(move_dir.x)
+        put(move_dir.y)
+        put(aim_target.x - player.pos.x)
+        put(aim_target.y - player.pos.y)
+        put(player.charging)
+        put(fired)
+
+        self.tick += 1
+        self._n += 1
+        if self._n >= self.chunk_ticks:
+            self.flush()
+
+    def _put(self, value):
+        self._buffers[self._active][self._col, self._n] = value
+        self._col += 1
+
+    def flush(self, wait=False):
+        if self._n == 0:
+            if wait and self._writer:
+                self._writer.join()
+            return
+        if self._writer:
+            self._writer.join()
+        name = f"shard-{len(self.shards):05d}.npy"
+        data = self._buffers[self._active][:, :self._n]
+        self.shards.append({"file": name, "ticks": self._n})
+        self._writer = threading.Thread(target=self._write_shard, args=(name, data, list(self.shards)),
+                                        name="dataset-writer", daemon=True)
+        self._writer.start()
+        self._active ^= 1
+        self._n = 0
+        if wait:
+            self._writer.join()
+
+    def close(self):
+        self.flush(wait=True)
+
+    def _write_shard(self, name, data, shards):
+        # np.save writes a contiguous copy for a partial (sliced) chunk
+        np.save(os.path.join(self.directory, name), data)
+        manifest = {"columns": list(DATASET_COLUMNS), "dtype": "float32", "layout": "columns x ticks",
+                    "shards": shards}
+        tmp = os.path.join(self.directory, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.directory, "manifest.json"))
+
+
+def iter_dataset_shards(directory, columns=None):
+    """
+    Lazily yields one {column: array} dict per shard. Arrays are zero-copy views
+    into a memory-mapped shard, so pages are only read when training touches them.
+    """
+    if np is None:
+        raise RuntimeError("dataset loading needs numpy")
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    index = {name: i for i, name in enumerate(manifest["columns"])}
+    wanted = columns or manifest["columns"]
+    for shard in manifest["shards"]:
+        data = np.load(os.path.join(directory, shard["file"]), mmap_mode="r")
+        yield {name: data[index[name]] for name in wanted}
+
+class DangerField:
+    """
+    Coarse grid over the boss half (above CENTER_Y) counting how much predicted
+    player-shot path crosses each cell, weighted towards shots that arrive soon.
+    A shot's stamp is added once, kept with its cell indices, and subtracted when
+    the shot dies or is re-stamped, so a tick only pays for new or aging shots.
+    """
+
+    def __init__(self, cell=DANGER_CELL):
+        self.cell = cell
+        self.cols = int(math.ceil(SCREEN_W / cell))
+        self.rows = int(math.ceil(CENTER_Y / cell))
+        self.grid = np.zeros(self.rows * self.cols)
+        self.stamps = {}  # projectile -> (flat cell indices, weights, time stamped)
+        self.reach = MAX_PROJ_RADIUS + BOSS_RADIUS
+        r = int(math.ceil(self.reach / cell))
+        oy, ox = np.mgrid[-r:r + 1, -r:r + 1]
+        self._off_x = ox.ravel()
+        self._off_y = oy.ravel()
+
+    def sync(self, projectiles, now, boss_radius=BOSS_RADIUS, reaction=0.0):
+        """Brings the grid up to date; shots younger than `reaction` seconds are not seen yet."""
+        max_life = PROJECTILE_LIFETIME - reaction
+        seen = 0
+        for p in projectiles:
+            if p.owner != "player" or p.hit or p.life > max_life:
+                continue
+            seen += 1
+            stamp = self.stamps.get(p)
+            if stamp is None or now - stamp[2] >= DANGER_RESTAMP_INTERVAL:
+                if stamp is not None:
+                    np.subtract.at(self.grid, stamp[0], stamp[1])
+                self.stamps[p] = self._stamp(p, now, boss_radius)
+        if seen != len(self.stamps):
+            live = {p for p in projectiles if p.owner == "player" and not p.hit and p.life <= max_life}
+            for p in [p for p in self.stamps if p not in live]:
+                idx, w, _ = self.stamps.pop(p)
+                np.subtract.at(self.grid, idx, w)
+
+    def _stamp(self, p, now, boss_radius):
+        speed = max(p.vel.length(), 1.0)
+        spacing = 0.5 * self.cell / speed  # seconds between path samples (half a cell)
+        horizon = min(p.life, DANGER_HORIZON)
+        t = np.arange(0.0, horizon, spacing)[:128]
+        xs = p.pos.x + p.vel.x * t
+        ys = p.pos.y + p.vel.y * t
+        reach = p.radius + boss_radius
+        near = ys < CENTER_Y + reach
+        t, xs, ys = t[near], xs[near], ys[near]
+
+        cx = (xs // self.cell).astype(int)[:, None] + self._off_x
+        cy = (ys // self.cell).astype(int)[:, None] + self._off_y
+        dx = (cx + 0.5) * self.cell - xs[:, None]
+        dy = (cy + 0.5) * self.cell - ys[:, None]
+        mask = ((dx * dx + dy * dy <= reach * reach)
+                & (cx >= 0) & (cx < self.cols) & (cy >= 0) & (cy < self.rows))
+        weight = np.broadcast_to((0.5 / (1.0 + 2.0 * t))[:, None], mask.shape)
+        idx = (cy * self.cols + cx)[mask]
+        w = weight[mask]
+        np.add.at(self.grid, idx, w)
+        return idx, w, now
+
+    def sample(self, x, y):
+        cx = int(x // self.cell)
+        cy = int(y // self.cell)
+        if 0 <= cx < self.cols and 0 <= cy < self.rows:
+            return self.grid[cy * self.cols + cx]
+        return 0.0
+
+
+def obstacle_distance(shape, x, y):
+    """Exact signed distance from (x, y) to one obstacle, negative inside."""
+    if shape[0] == "pillar":
+        _, cx, cy, r = shape
+        return math.hypot(x - cx, y - cy) - r
+    _, ax, ay, bx, by, r = shape
+    abx, aby = bx - ax, by - ay
+    t = clamp(((x - ax) * abx + (y - ay) * aby) / (abx * abx + aby * aby), 0.0, 1.0)
+    return math.hypot(x - ax - abx * t, y - ay - aby * t) - r
+
+
+class ArenaField:
+    """
+    Signed distance to the nearest obstacle of a layout, computed once at the
+    corners of an SDF_CELL grid and bilinearly interpolated, so every query costs
+    four lookups however many obstacles there are. The gradient of the
+    interpolant points away from the nearest surface. Each sample also records
+    whether its nearest obstacle is a pillar (shots bounce) or a barrier.
+    """
+
+    def __init__(self, shapes, cell=SDF_CELL):
+        self.shapes = shapes
+        self.cell = cell
+        self.inv_cell = 1.0 / cell
+        self.cols = int(math.ceil(SCREEN_W / cell)) + 1
+        self.rows = int(math.ceil(SCREEN_H / cell)) + 1
+        self.dist = []
+        self.bounce = []
+        self.grid = None  # dist as a numpy array, for distances()
+        for j in range(self.rows):
+            for i in range(self.cols):
+                best, kind = min((obstacle_distance(sh, i * cell, j * cell), sh[0]) for sh in shapes)
+                self.dist.append(best)
+                self.bounce.append(kind == "pillar")
+
+    def sample(self, x, y):
+        """(distance, unit gradient x, unit gradient y) at a point."""
+        fx = min(max(x * self.inv_cell, 0.0), self.cols - 1.001)
+        fy = min(max(y * self.inv_cell, 0.0), self.rows - 1.001)
+        i, j = int(fx), int(fy)
+        fx -= i
+        fy -= j
+        k = j * self.cols + i
+        d = self.dist
+        d00, d10 = d[k], d[k + 1]
+        d01, d11 = d[k + self.cols], d[k + self.cols + 1]
+        top = d00 + (d10 - d00) * fx
+        bottom = d01 + (d11 - d01) * fx
+        gx = (d10 - d00) * (1.0 - fy) + (d11 - d01) * fy
+        gy = bottom - top
+        length = math.sqrt(gx * gx + gy * gy)
+        if length < 1e-9:
+            return top + gy * fy, 0.0, 0.0
+        return top + gy * fy, gx / length, gy / length
+
+    def distances(self, xs, ys):
+        """sample()'s distance for arrays of points (numpy)."""
+        if self.grid is None:
+            self.grid = np.array(self.dist).reshape(self.rows, self.cols)
+        fx = np.clip(xs * self.inv_cell, 0.0, self.cols - 1.001)
+        fy = np.clip(ys * self.inv_cell, 0.0, self.rows - 1.001)
+        i = fx.astype(np.intp)
+        j = fy.astype(np.intp)
+        fx -= i
+        fy -= j
+        g = self.grid
+        top = g[j, i] + (g[j, i + 1] - g[j, i]) * fx
+        bottom = g[j + 1, i] + (g[j + 1, i + 1] - g[j + 1, i]) * fx
+        return top + (bottom - top) * fy
+
+    def bounces_at(self, x, y):
+        i = min(max(int(x * self.inv_cell + 0.5), 0), self.cols - 1)
+        j = min(max(int(y * self.inv_cell + 0.5), 0), self.rows - 1)
+        return self.bounce[j * self.cols + i]
+
+    def push_out(self, pos, vel, radius):
+        """Moves a circle out of any obstacle it overlaps and drops its velocity into the surface."""
+        d, nx, ny = self.sample(pos.x, pos.y)
+        if d >= radius:
+            return
+        pos.x += nx * (radius - d)
+        pos.y += ny * (radius - d)
+        into = vel.x * nx + vel.y * ny
+        if into < 0.0:
+            vel.x -= into * nx
+            vel.y -= into * ny
+
+    def sweep(self, p, dt):
+        """
+        Moves a projectile through dt by sphere tracing its path: each step goes as
+        far as the clearance allows (at least SDF_MIN_STEP), so a shot in open space
+        costs one sample per tick and can't tunnel through a thin barrier. A pillar
+        reflects it with OBSTACLE_BOUNCE of its speed, up to OBSTACLE_MAX_BOUNCES;
+        barriers and further contacts absorb it. True if it was absorbed.
+        """
+        pos, vel = p.pos, p.vel
+        p.life -= dt
+        remaining = dt
+        while remaining > 0.0:
+            speed = math.sqrt(vel.x * vel.x + vel.y * vel.y)
+            if speed < 1e-6:
+                return False
+            ux, uy = vel.x / speed, vel.y / speed
+            travel = speed * remaining
+            s = 0.0
+            while True:
+                x, y = pos.x + ux * s, pos.y + uy * s
+                d, nx, ny = self.sample(x, y)
+                clearance = d - p.radius
+                if clearance <= SDF_CONTACT and ux * nx + uy * ny < 0.0:
+                    break
+                if s >= travel:
+                    pos.x, pos.y = x, y
+                    return False
+                s = min(travel, s + max(clearance, SDF_MIN_STEP))
+            pos.x, pos.y = x, y
+            remaining -= s / speed
+            if p.bounces >= OBSTACLE_MAX_BOUNCES or not self.bounces_at(x, y):
+                p.hit = True
+                return True
+            p.bounces += 1
+            dot = 2.0 * (vel.x * nx + vel.y * ny)
+            vel.x = (vel.x - dot * nx) * OBSTACLE_BOUNCE
+            vel.y = (vel.y - dot * ny) * OBSTACLE_BOUNCE
+        return False
+
+
+_arena_fields = {}
+
+
+def arena_field(layout):
+    """Shared ArenaField for a layout name (built on first use), or None for an empty arena."""
+    if not ARENA_LAYOUTS[layout]:
+        return None
+    field = _arena_fields.get(layout)
+    if field is None:
+        field = _arena_fields[layout] = ArenaField(ARENA_LAYOUTS[layout])
+    return field
+
+
+COMPASS_DIRS = [Vector2(math.cos(a * math.pi / 4), math.sin(a * math.pi / 4)) for a in range(8)] + [Vector2(0, 0)]
+
+
+class AIBudget:
+    """
+    Per-frame cap on boss think time shared by every arena in the process. Bosses
+    that find it spent defer their think to a later tick (their dt keeps
+    accumulating), unless they have already been starved for BOSS_THINK_MAX_DEFER.
+    """
+
+    def __init__(self, budget_ms=BOSS_THINK_BUDGET_MS):
+        self.budget = budget_ms / 1000.0
+        self.spent = 0.0
+        self.deferred = 0
+
+    def begin_frame(self):
+        self.spent = 0.0
+
+    def admit(self, overdue=False):
+        if overdue or self.spent < self.budget:
+            return True
+        self.deferred += 1
+        return False
+
+    def spend(self, seconds):
+        self.spent += seconds
+
+
+ai_budget = AIBudget()
+
+
+# Hot-path math below mutates vectors component-wise instead of building Vector2
+# temporaries, using the same formulas pygame does (lerp = a*(1-t) + b*t,
+# v / d = v * (1/d)) so results stay bit-identical.
+
 class Particle:
+    __slots__ = ("pos", "vel", "life", "max_life", "color", "size")
+
     def __init__(self, pos: Vector2, vel: Vector2, life: float, color: tuple, size: float):
         self.pos = Vector2(pos)
         self.vel = Vector2(vel)
@@ -168,22 +1032,28 @@ class Particle:
         self.size = size
 
     def update(self, dt):
-        self.pos += self.vel * dt
-        self.vel *= clamp(1 - 3.0 * dt, 0.0, 1.0)
+        pos, vel = self.pos, self.vel
+        pos.x += vel.x * dt
+        pos.y += vel.y * dt
+        k = clamp(1 - 3.0 * dt, 0.0, 1.0)
+        vel.x *= k
+        vel.y *= k
         self.life -= dt
 
-    def draw(self, surf):
+    def draw(self, surf, scale=1.0):
         if self.life <= 0:
             return
         frac = clamp(self.life / self.max_life, 0.0, 1.0)
         alpha = int(255 * frac)
         r, g, b = self.color
-        size = max(1, int(self.size * (0.6 + 0.4 * frac)))
+        size = max(1, int(self.size * (0.6 + 0.4 * frac) * scale))
         s = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
         pygame.draw.circle(s, (r, g, b, alpha), (size, size), size)
-        surf.blit(s, (int(self.pos.x - size), int(self.pos.y - size)))
+        surf.blit(s, (int(self.pos.x * scale - size), int(self.pos.y * scale - size)))
 
 class Projectile:
+    __slots__ = ("pos", "vel", "radius", "damage", "life", "hit", "owner", "bounces")
+
     def __init__(self, pos: Vector2, vel: Vector2, radius: float, damage: float, owner_tag: str):
         self.pos = Vector2(pos)
         self.vel = Vector2(vel)
@@ -192,15 +1062,18 @@ class Projectile:
         self.life = PROJECTILE_LIFETIME
         self.hit = False
         self.owner = owner_tag
+        self.bounces = 0
 
     def update(self, dt):
-        self.pos += self.vel * dt
+        self.pos.x += self.vel.x * dt
+        self.pos.y += self.vel.y * dt
         self.life -= dt
 
-    def draw(self, surf):
-        outer = int(self.radius * 2.4)
-        pygame.draw.circle(surf, PROJECTILE_GLOW, (int(self.pos.x), int(self.pos.y)), outer)
-        pygame.draw.circle(surf, (255, 255, 255), (int(self.pos.x), int(self.pos.y)), int(self.radius))
+    def draw(self, surf, scale=1.0, glow=True):
+        center = (int(self.pos.x * scale), int(self.pos.y * scale))
+        if glow:
+            pygame.draw.circle(surf, PROJECTILE_GLOW, center, int(self.radius * 2.4 * scale))
+        pygame.draw.circle(surf, (255, 255, 255), center, int(self.radius * scale))
 
     def is_dead(self):
         if self.life <= 0 or self.hit:
@@ -210,8 +1083,9 @@ class Projectile:
         return False
 
 class Player:
-    def __init__(self, pos: Vector2, side="bottom"):
+    def __init__(self, pos: Vector2, side="bottom", arena=None):
         self.pos = Vector2(pos)
+        self.arena = arena
         self.vel = Vector2(0, 0)
         self.input_mag = 0.0
         self.charging = False
@@ -249,44 +1123,56 @@ class Player:
         self.hit_timer = HIT_FLASH_TIME
         self.health = max(self.health, 0)
 
-    def update(self, dt, raw_input_dir: Vector2):
+    def update(self, dt, raw_input_dir: Vector2, now):
         # reload handling (per-bullet). bullets become available immediately when loaded.
         if self.reloading:
             self.reload_timer -= dt
             while self.reloading and self.reload_timer <= 0:
                 if self.ammo < self.max_ammo:
                     self.ammo += 1
-                    if reload_sound:
-                        reload_sound.play()
+                    play_sfx("reload", self.pos.x)
                     # schedule next bullet
                     if self.ammo < self.max_ammo:
                         self.reload_timer += PLAYER_RELOAD_PER_BULLET
                     else:
                         self.reloading = False
+                        telemetry.emit(TEV_RELOAD_DONE, ACTOR_PLAYER, self.ammo)
                 else:
                     self.reloading = False
+                    telemetry.emit(TEV_RELOAD_DONE, ACTOR_PLAYER, self.ammo)
 
         # auto-start reload if player hasn't shot recently or if magazine is empty
         if not self.reloading and self.ammo < self.max_ammo:
-            if (pygame.time.get_ticks() / 1000.0 - self.last_shot_time) >= self.auto_reload_delay or self.ammo == 0:
+            if (now - self.last_shot_time) >= self.auto_reload_delay or self.ammo == 0:
                 self.start_reload()
 
-        target_mag = 1.0 if raw_input_dir.length_squared() > 0.0001 else 0.0
+        ix, iy = raw_input_dir.x, raw_input_dir.y
+        input_len_sq = ix * ix + iy * iy
+        target_mag = 1.0 if input_len_sq > 0.0001 else 0.0
         if INPUT_RAMP_TIME > 0:
             alpha = clamp(dt / INPUT_RAMP_TIME, 0.0, 1.0)
             self.input_mag = (1 - alpha) * self.input_mag + alpha * target_mag
         else:
             self.input_mag = target_mag
 
-        dir_vec = raw_input_dir.normalize() if raw_input_dir.length_squared() > 0.0001 else Vector2(0, 0)
-        accel = dir_vec * (ACCEL_STRENGTH * self.input_mag)
-        self.vel += accel * dt
-        self.vel = self.vel.lerp(Vector2(0, 0), clamp(DRAG * dt, 0, 1))
-
-        if self.vel.length() > MAX_SPEED:
-            self.vel = self.vel.normalize() * MAX_SPEED
-
-        self.pos += self.vel * dt
+        vel, pos = self.vel, self.pos
+        if input_len_sq > 0.0001:
+            length = math.sqrt(input_len_sq)
+            strength = ACCEL_STRENGTH * self.input_mag
+            vel.x += (ix / length * strength) * dt
+            vel.y += (iy / length * strength) * dt
+        # drag: lerp towards zero
+        keep = 1 - clamp(DRAG * dt, 0, 1)
+        vel.x *= keep
+        vel.y *= keep
+
+        speed = math.sqrt(vel.x * vel.x + vel.y * vel.y)
+        if speed > MAX_SPEED:
+            vel.x = vel.x / speed * MAX_SPEED
+            vel.y = vel.y / speed * MAX_SPEED
+
+        pos.x += vel.x * dt
+        pos.y += vel.y * dt
 
         # clamp to halves (horizontal wall): bottom or top
         if self.side == "bottom":
@@ -295,6 +1181,8 @@ class Player:
         else:
             self.pos.y = clamp(self.pos.y, self.radius, min(SCREEN_H - self.radius, CENTER_Y - 1))
             self.pos.x = clamp(self.pos.x, self.radius, SCREEN_W - self.radius)
+        if self.arena is not None:
+            self.arena.push_out(pos, vel, self.radius)
 
         if self.hit_timer > 0:
             self.hit_timer -= dt
@@ -304,21 +1192,23 @@ class Player:
             self.reloading = True
             # start with first bullet timer
             self.reload_timer = PLAYER_RELOAD_PER_BULLET
+            telemetry.emit(TEV_RELOAD_START, ACTOR_PLAYER, self.ammo)
 
     def record_shot(self, now):
         self.last_shot_time = now
 
-    def draw(self, surf, aim_dir: Vector2, charge_frac: float):
+    def draw(self, surf, aim_dir: Vector2, charge_frac: float, scale=1.0):
         base_col = PLAYER_COLOR
         if self.hit_timer > 0:
             base_col = (255, 255, 255)
-        px, py = int(self.pos.x), int(self.pos.y)
+        px, py = int(self.pos.x * scale), int(self.pos.y * scale)
 
         if charge_frac > 0:
-            ring_r = int(self.radius + 6 + charge_frac * 20)
+            ring_r = int((self.radius + 6 + charge_frac * 20) * scale)
+            ring_w = max(1, int(6 * scale))
             s = pygame.Surface((ring_r * 2 + 4, ring_r * 2 + 4), pygame.SRCALPHA)
             pygame.draw.circle(s, (CHARGE_COLOR[0], CHARGE_COLOR[1], CHARGE_COLOR[2], 90),
-                               (ring_r + 2, ring_r + 2), ring_r, width=6)
+                               (ring_r + 2, ring_r + 2), ring_r, width=ring_w)
             surf.blit(s, (px - ring_r - 2, py - ring_r - 2))
 
         if PLAYER_SHAPE == "triangle":
@@ -328,13 +1218,14 @@ class Player:
                 forward = aim_dir.normalize()
             size = self.radius
             perp = Vector2(-forward.y, forward.x)
-            p1 = self.pos + forward * (size * 1.2)
-            p2 = self.pos - forward * (size * 0.7) + perp * (size * 0.7)
-            p3 = self.pos - forward * (size * 0.7) - perp * (size * 0.7)
+            p1 = (self.pos + forward * (size * 1.2)) * scale
+            p2 = (self.pos - forward * (size * 0.7) + perp * (size * 0.7)) * scale
+            p3 = (self.pos - forward * (size * 0.7) - perp * (size * 0.7)) * scale
             pygame.draw.polygon(surf, base_col, [(p1.x, p1.y), (p2.x, p2.y), (p3.x, p3.y)])
-            pygame.draw.polygon(surf, (20, 20, 20), [(p1.x, p1.y), (p2.x, p2.y), (p3.x, p3.y)], width=2)
+            pygame.draw.polygon(surf, (20, 20, 20), [(p1.x, p1.y), (p2.x, p2.y), (p3.x, p3.y)],
+                                width=max(1, int(2 * scale)))
         else:
-            half = self.radius
+            half = max(1, int(self.radius * scale))
             angle = math.atan2(aim_dir.y, aim_dir.x) if aim_dir.length_squared() > 1e-4 else 0
             rect = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
             pygame.draw.rect(rect, base_col, rect.get_rect())
@@ -344,80 +1235,65 @@ class Player:
             pygame.draw.rect(surf, (20, 20, 20), rrect, width=2)
 
 class Boss:
-    def __init__(self, pos: Vector2, difficulty="Normal"):
+    def __init__(self, pos: Vector2, difficulty="Normal", rng=None, policy=None, personality=None,
+                 think_hz=None, think_phase=0.0, tuning=None, arena=None, bullets=None):
+        # every random decision goes through the boss's own generator so seeded matches replay exactly
+        self.rng = rng if rng is not None else random.Random()
+        self.policy_out = None  # per-boss scratch for policies (e.g. a batched MLP output row)
         self.pos = Vector2(pos)
+        self.arena = arena
         self.last_player_pos = None
         self.player_velocity = Vector2(0, 0)
         self.vel = Vector2(0, 0)
         self.target_vel = Vector2(0, 0)
-        self.fake_charge_chance = 0.25
         self.is_fake_charging = False
         self.panic_mode = False
         self.visual_charge = 0.0
         self.radius = BOSS_RADIUS
-        self.preferred_dist = 260
-
-
-
 
         # ---------------- Difficulty ----------------
-        if difficulty == "Easy":
-            self.max_health = int(BOSS_MAX_HEALTH_BASE * 0.8)
-            self.move_speed = BOSS_MOVE_SPEED_BASE * 0.9
-            self.aggression = 0.85
-        elif difficulty == "Hard":
-            self.max_health = int(BOSS_MAX_HEALTH_BASE * 1.4)
-            self.move_speed = BOSS_MOVE_SPEED_BASE * 1.2
-            self.aggression = 1.2
-        else:
-            self.max_health = BOSS_MAX_HEALTH_BASE
-            self.move_speed = BOSS_MOVE_SPEED_BASE
-            self.aggression = 1.0
+        params = tuned(DIFFICULTY_PARAMS, difficulty if difficulty in DIFFICULTY_PARAMS else "Normal", tuning)
+        self.max_health = int(BOSS_MAX_HEALTH_BASE * params["health"])
+        self.move_speed = BOSS_MOVE_SPEED_BASE * params["speed"]
+        self.aggression = params["aggression"]
+        self.pattern_rate = params["pattern_rate"]
 
         self.health = self.max_health
+        self.logged_aggression = self.aggression
 
         # ---------------- Personality ----------------
-        self.personality = random.choice(["Sniper", "Brawler", "Trickster", "Adaptive"])
-
-        if self.personality == "Sniper":
-            self.preferred_dist = 340
-            self.retreat_bias = 0.55
-        elif self.personality == "Brawler":
-            self.preferred_dist = 220
-            self.retreat_bias = 0.25
-        elif self.personality == "Trickster":
-            self.preferred_dist = 280
-            self.retreat_bias = 0.45
-        else:
-            self.preferred_dist = 260
-            self.retreat_bias = 0.4
+        personalities = ["Sniper", "Brawler", "Trickster", "Adaptive"]
+        if difficulty == "Hard" and np is not None:
+            personalities.append("Planner")
+        # rolled even when forced, so a replay that forces the recorded personality keeps the rng in step
+        rolled = self.rng.choice(personalities)
+        self.personality = personality or rolled
+        params = tuned(PERSONALITY_PARAMS, self.personality if self.personality in PERSONALITY_PARAMS
+                       else "Adaptive", tuning)
+        self.preferred_dist = params["preferred_dist"]
+        self.retreat_bias = params["retreat_bias"]
+        self.fire_bias = params["fire_bias"]
+        self.fake_charge_chance = params["fake_charge_chance"]
 
         # Distance comfort band (CRITICAL FIX)
         self.comfort_min = self.preferred_dist - 45
         self.comfort_max = self.preferred_dist + 45
 
-        # -------- Firing personality --------
-        if self.personality == "Sniper":
-            self.fire_bias = 0.45
-        elif self.personality == "Brawler":
-            self.fire_bias = 0.85
-        elif self.personality == "Trickster":
-            self.fire_bias = 0.65
-        else:  # Adaptive
-            self.fire_bias = 0.7
-
+        if policy is None:
+            policy = PlannerBossPolicy() if self.personality == "Planner" else HeuristicBossPolicy()
+        self.policy = policy
 
         # ---------------- Movement commitment ----------------
-        self.move_commit_timer = random.uniform(0.4, 0.9)
+        self.move_commit_timer = self.rng.uniform(0.4, 0.9)
         self.committed_dir = Vector2(0, 0)
 
         # ---------------- Proactive disengage ----------------
-        self.reset_timer = random.uniform(2.5, 4.5)
+        self.reset_timer = self.rng.uniform(2.5, 4.5)
         self.reset_duration = 0.0
 
         # ---------------- Combat ----------------
         self.state = BOSS_STATE_STRAFE
-        self.state_timer = random.uniform(0.8, 1.6)
+        self.state_timer = self.rng.uniform(0.8, 1.6)
 
         self.max_ammo = BOSS_MAX_AMMO
         self.ammo = self.max_ammo
@@ -429,12 +1305,28 @@ class Boss:
         self.charging = False
         self.charge_start = None
         self.time_since_last_shot = 0.0
+        self.shots_fired = 0
+        self.fake_charges = 0
 
         # ---------------- Learning ----------------
         self.player_shot_count = 0
         self.player_hit_count = 0
         self.player_positions = collections.deque(maxlen=BOSS_LEARN_WINDOW)
 
+        # ---------------- Think rate ----------------
+        think_hz = BOSS_THINK_HZ if think_hz is None else think_hz
+        self.think_interval = 1.0 / think_hz if think_hz > 0 else 0.0
+        self.think_timer = think_phase * self.think_interval  # stagger arenas across the interval
+        self.think_dt = 0.0
+
+        # ---------------- Dodging ----------------
+        self.danger = DangerField() if np is not None else None
+        self.dodge_reaction = DANGER_REACTION.get(difficulty, DANGER_REACTION["Normal"])
+
+        # ---------------- Bullet-hell phase ----------------
+        self.bullets = bullets  # the match's BulletPool (None: no phase)
+        self.emitter = None     # PatternEmitter once health falls below BULLET_HELL_HEALTH
+
         # ---------------- FX ----------------
         self.hit_timer = 0.0
         self.vibrate_timer = 0.0
@@ -447,29 +1339,69 @@ class Boss:
     def update(self, dt, player, projectiles_out, now):
         if self.health <= 0:
             return
-        
+        if (self.emitter is None and self.bullets is not None
+                and self.health <= self.max_health * BULLET_HELL_HEALTH):
+            self.emitter = PatternEmitter(self.pattern_rate)
+            self.is_fake_charging = False
+            self.visual_charge = 0.0
+            telemetry.emit(TEV_BOSS_PHASE, ACTOR_BOSS, self.health)
+
+        # "think" (policy decisions) runs at think_hz with the time accumulated since the
+        # last think; "act" (velocity smoothing, integration, fx) runs every tick
+        self.think_timer -= dt
+        self.think_dt += dt
+        thinking = self.think_timer <= 0 and ai_budget.admit(self.think_dt >= BOSS_THINK_MAX_DEFER)
+        if thinking:
+            think_start = time.perf_counter()
+            think_dt = self.think_dt
+            self.policy.observe(self, player, projectiles_out)
+
         self._track_player_velocity(player, dt)
         self._update_reload(dt, now)
-        self._update_learning()
-        self._update_proactive_retreat(dt)
-        self._update_state(dt, player)
-        self._update_movement(dt, player)
+        if thinking:
+            if self.danger is not None:
+                self.danger.sync(projectiles_out, now, self.radius, self.dodge_reaction)
+            self.policy.steer(self, think_dt, player, projectiles_out)
         self._update_velocity(dt)
         self._update_position(dt)
-        self._update_shooting(dt, player, projectiles_out, now)
+        if self.emitter is not None:
+            self.emitter.update(dt, self, player)  # patterns replace the policy's shots
+        elif thinking:
+            self.policy.shoot(self, think_dt, player, projectiles_out, now)
+        if thinking:
+            self.policy_out = None  # consumed; the next think observes afresh (shoot may be skipped)
+            self.think_dt = 0.0
+            self.think_timer = max(self.think_timer + self.think_interval, 0.0)
+            ai_budget.spend(time.perf_counter() - think_start)
         self._update_fx(dt)
 
+    def think_due(self, dt):
+        return self.health > 0 and self.think_timer - dt <= 0
+
 
     def _track_player_velocity(self, player, dt):
-        if self.last_player_pos is not None:
-            self.player_velocity = (player.pos - self.last_player_pos) / max(dt, 1e-5)
-        self.last_player_pos = Vector2(player.pos)
+        pos = player.pos
+        last = self.last_player_pos
+        if last is None:
+            self.last_player_pos = Vector2(pos)
+            return
+        inv_dt = 1 / max(dt, 1e-5)
+        self.player_velocity.x = (pos.x - last.x) * inv_dt
+        self.player_velocity.y = (pos.y - last.y) * inv_dt
+        last.x = pos.x
+        last.y = pos.y
 
     def _get_predicted_aim(self, player, projectile_speed):
-        lead_time = clamp((player.pos - self.pos).length() / projectile_speed, 0.05, 0.6)
-        predicted_pos = player.pos + self.player_velocity * lead_time
-        aim = predicted_pos - self.pos
-        return aim.normalize() if aim.length_squared() > 1e-6 else Vector2(0, 1)
+        dx = player.pos.x - self.pos.x
+        dy = player.pos.y - self.pos.y
+        lead_time = clamp(math.sqrt(dx * dx + dy * dy) / projectile_speed, 0.05, 0.6)
+        ax = player.pos.x + self.player_velocity.x * lead_time - self.pos.x
+        ay = player.pos.y + self.player_velocity.y * lead_time - self.pos.y
+        len_sq = ax * ax + ay * ay
+        if len_sq > 1e-6:
+            length = math.sqrt(len_sq)
+            return Vector2(ax / length, ay / length)
+        return Vector2(0, 1)
 
 
 
@@ -478,15 +1410,15 @@ class Boss:
     # ======================================================
 
     def _update_movement(self, dt, player):
-        to_player = player.pos - self.pos
-        dist = to_player.length()
-        dir_to_player = to_player.normalize() if dist > 1e-4 else Vector2(0, 1)
-        perp = Vector2(-dir_to_player.y, dir_to_player.x)
-
         self.move_commit_timer -= dt
 
         if self.move_commit_timer <= 0:
-            self.move_commit_timer = random.uniform(0.45, 0.95)
+            self.move_commit_timer = self.rng.uniform(0.45, 0.95)
+
+            to_player = player.pos - self.pos
+            dist = to_player.length()
+            dir_to_player = to_player.normalize() if dist > 1e-4 else Vector2(0, 1)
+            perp = Vector2(-dir_to_player.y, dir_to_player.x)
 
             move = Vector2(0, 0)
 
@@ -497,8 +1429,8 @@ class Boss:
                 move = dir_to_player
             else:
                 # Inside comfort → lateral drift or idle
-                if random.random() < 0.7:
-                    move = perp * random.choice([-1, 1])
+                if self.rng.random() < 0.7:
+                    move = perp * self.rng.choice([-1, 1])
                 else:
                     move = Vector2(0, 0)
 
@@ -507,24 +1439,63 @@ class Boss:
                 move = -dir_to_player
 
             self.committed_dir = move.normalize() if move.length() > 0 else Vector2(0, 0)
+            self.committed_dir = self._safest_direction(self.committed_dir)
+        elif self._heading_danger(self.committed_dir) > DANGER_THRESHOLD:
+            # a shot is crossing our path: break commitment and sidestep
+            self.committed_dir = self._safest_direction(self.committed_dir)
 
         # Desired velocity (NOT raw acceleration)
-        self.target_vel = self.committed_dir * self.move_speed * clamp(self.aggression, 0.7, 1.4)
+        self.target_vel.x = self.committed_dir.x * self.move_speed * clamp(self.aggression, 0.7, 1.4)
+        self.target_vel.y = self.committed_dir.y * self.move_speed * clamp(self.aggression, 0.7, 1.4)
+
+    def _heading_danger(self, direction):
+        if self.danger is None:
+            return 0.0
+        d = self.danger
+        near, far = DANGER_LOOKAHEAD
+        return (d.sample(self.pos.x, self.pos.y)
+                + d.sample(self.pos.x + direction.x * near, self.pos.y + direction.y * near)
+                + d.sample(self.pos.x + direction.x * far, self.pos.y + direction.y * far))
+
+    def _safest_direction(self, preferred):
+        """Keeps `preferred` unless it runs into danger; otherwise the least dangerous compass move."""
+        if self._heading_danger(preferred) <= DANGER_THRESHOLD:
+            return preferred
+        best, best_score = preferred, float("inf")
+        for d in COMPASS_DIRS:
+            # small bias towards what the movement logic wanted
+            score = self._heading_danger(d) + 0.1 * (1.0 - d.dot(preferred))
+            if score < best_score:
+                best, best_score = d, score
+        return Vector2(best)
 
     def _update_velocity(self, dt):
         # Smooth velocity (kills jitter)
-        self.vel = self.vel.lerp(self.target_vel, 0.12)
+        vel = self.vel
+        vel.x = vel.x * (1 - 0.12) + self.target_vel.x * 0.12
+        vel.y = vel.y * (1 - 0.12) + self.target_vel.y * 0.12
 
         # Soft wall avoidance (no bouncing)
         wall_dist = abs(self.pos.y - CENTER_Y)
         if wall_dist < 60:
             push = 220 * (1 - wall_dist / 60)
             self.vel.y += push * dt * (1 if self.pos.y < CENTER_Y else -1)
+        # ... and the same push away from obstacles, along the distance field's gradient
+        if self.arena is not None:
+            d, nx, ny = self.arena.sample(self.pos.x, self.pos.y)
+            clearance = max(d - self.radius, 0.0)
+            if clearance < OBSTACLE_AVOID_DIST:
+                push = 220 * (1 - clearance / OBSTACLE_AVOID_DIST) * dt
+                vel.x += nx * push
+                vel.y += ny * push
 
     def _update_position(self, dt):
-        self.pos += self.vel * dt
+        self.pos.x += self.vel.x * dt
+        self.pos.y += self.vel.y * dt
         self.pos.x = clamp(self.pos.x, self.radius, SCREEN_W - self.radius)
         self.pos.y = clamp(self.pos.y, self.radius, CENTER_Y - 1)
+        if self.arena is not None:
+            self.arena.push_out(self.pos, self.vel, self.radius)
 
     # ======================================================
     # ---------------- STATE & AI ---------------------------
@@ -533,15 +1504,20 @@ class Boss:
     def _update_state(self, dt, player):
         self.state_timer -= dt
         if self.state_timer <= 0:
-            self.state = random.choice([BOSS_STATE_STRAFE, BOSS_STATE_POKE])
-            self.state_timer = random.uniform(0.8, 1.6)
+            new_state = self.rng.choice([BOSS_STATE_STRAFE, BOSS_STATE_POKE])
+            if new_state != self.state:
+                telemetry.emit(TEV_BOSS_STATE, ACTOR_BOSS,
+                               BOSS_STATES.index(self.state), BOSS_STATES.index(new_state))
+            self.state = new_state
+            self.state_timer = self.rng.uniform(0.8, 1.6)
 
     def _update_proactive_retreat(self, dt):
         self.reset_timer -= dt
         if self.reset_timer <= 0:
-            if random.random() < self.retreat_bias:
-                self.reset_duration = random.uniform(0.6, 1.2)
-            self.reset_timer = random.uniform(2.5, 4.5)
+            if self.rng.random() < self.retreat_bias:
+                self.reset_duration = self.rng.uniform(0.6, 1.2)
+                telemetry.emit(TEV_RETREAT, ACTOR_BOSS, self.reset_duration)
+            self.reset_timer = self.rng.uniform(2.5, 4.5)
 
         if self.reset_duration > 0:
             self.reset_duration -= dt
@@ -559,11 +1535,16 @@ class Boss:
         if player_fired:
             self.player_shot_count += 1
 
-    def _update_learning(self):
+    def _update_learning(self, dt):
         if self.player_shot_count >= 10:
             acc = self.player_hit_count / max(1, self.player_shot_count)
-            self.aggression *= 0.97 if acc > 0.5 else 1.03
+            # a 3% step per frame, compounded over however many frames this think covers
+            self.aggression *= (0.97 if acc > 0.5 else 1.03) ** (dt * FPS)
             self.aggression = clamp(self.aggression, 0.6, 1.6)
+            # aggression drifts every frame; only log meaningful moves
+            if abs(self.aggression - self.logged_aggression) >= 0.05:
+                self.logged_aggression = self.aggression
+                telemetry.emit(TEV_AGGRESSION, ACTOR_BOSS, self.aggression, acc)
 
     # ======================================================
     # ---------------- RELOAD -------------------------------
@@ -577,11 +1558,13 @@ class Boss:
                 self.reload_timer = BOSS_RELOAD_PER_BULLET
                 if self.ammo >= self.max_ammo:
                     self.reloading = False
+                    telemetry.emit(TEV_RELOAD_DONE, ACTOR_BOSS, self.ammo)
 
         if not self.reloading and self.ammo < self.max_ammo:
             if now - self.last_shot_time >= self.auto_reload_delay:
                 self.reloading = True
                 self.reload_timer = BOSS_RELOAD_PER_BULLET
+                telemetry.emit(TEV_RELOAD_START, ACTOR_BOSS, self.ammo)
 
     # ======================================================
     # ---------------- DAMAGE & FX --------------------------
@@ -600,20 +1583,21 @@ class Boss:
         if self.vibrate_timer > 0:
             self.vibrate_timer -= dt
             mag = BOSS_VIBRATE_MAG * (self.vibrate_timer / BOSS_VIBRATE_TIME)
-            self.vibrate_offset = Vector2(random.uniform(-mag, mag), random.uniform(-mag, mag))
+            self.vibrate_offset.x = self.rng.uniform(-mag, mag)
+            self.vibrate_offset.y = self.rng.uniform(-mag, mag)
         else:
-            self.vibrate_offset = Vector2(0, 0)
+            self.vibrate_offset.x = self.vibrate_offset.y = 0
 
     # ======================================================
     # ---------------- DRAW --------------------------------
     # ======================================================
 
-    def draw(self, surf):
-        pos = self.pos + self.vibrate_offset
-        pygame.draw.circle(surf, BOSS_COLOR, pos, self.radius)
-        pygame.draw.circle(surf, (20, 20, 20), pos, self.radius, 3)
+    def draw(self, surf, scale=1.0):
+        pos = (self.pos + self.vibrate_offset) * scale
+        pygame.draw.circle(surf, BOSS_COLOR, pos, self.radius * scale)
+        pygame.draw.circle(surf, (20, 20, 20), pos, self.radius * scale, max(1, int(3 * scale)))
         if self.visual_charge > 0:
-            ring_r = int(self.radius + 12 + self.visual_charge * 28)
+            ring_r = int((self.radius + 12 + self.visual_charge * 28) * scale)
             ring_alpha = int(120 + 100 * self.visual_charge)
             ring = pygame.Surface((ring_r * 2, ring_r * 2), pygame.SRCALPHA)
             pygame.draw.circle(
@@ -621,7 +1605,7 @@ class Boss:
                 (255, 80, 80, ring_alpha),
                 (ring_r, ring_r),
                 ring_r,
-                width=6
+                width=max(1, int(6 * scale))
             )
             surf.blit(ring, (pos.x - ring_r, pos.y - ring_r))
 
@@ -658,31 +1642,33 @@ class Boss:
             border_radius=6
         )
         
-    def _update_shooting(self, dt, player, projectiles_out, now):
-        self.time_since_last_shot += dt
-
+    def _fire_cooldown(self):
         cooldown = BOSS_FIRE_COOLDOWN_BASE / clamp(self.aggression, 0.7, 1.4)
 
-        self.panic_mode = self.ammo <= max(1, self.max_ammo // 3)
+        panic = self.ammo <= max(1, self.max_ammo // 3)
+        if panic != self.panic_mode:
+            telemetry.emit(TEV_PANIC, ACTOR_BOSS, 1.0 if panic else 0.0, self.ammo)
+        self.panic_mode = panic
         if self.panic_mode:
             cooldown *= 0.45
+        return cooldown
+
+    def _update_shooting(self, dt, player, projectiles_out, now):
+        self.time_since_last_shot += dt
+
+        cooldown = self._fire_cooldown()
 
         # No shooting while reloading or retreating
         if self.reloading or self.ammo <= 0 or self.reset_duration > 0:
             return
 
-        # Fake charge
-        if (
-            not self.is_fake_charging
-            and self.time_since_last_shot >= cooldown
-            and random.random() < self.fake_charge_chance
-        ):
-            self.is_fake_charging = True
-            self.charge_start = now
-            return
-
         if self.is_fake_charging:
-            if now - self.charge_start > random.uniform(0.25, 0.5):
+            # the feint's length is re-rolled every frame; keep those odds whatever dt is
+            elapsed = now - self.charge_start
+            stay = 1.0
+            for i in range(max(1, int(round(dt * FPS)))):
+                stay *= 1.0 - clamp((elapsed - i / FPS - 0.25) / 0.25, 0.0, 1.0)
+            if self.rng.random() >= stay:
                 self.is_fake_charging = False
                 self.time_since_last_shot = 0.0
             return
@@ -690,11 +1676,30 @@ class Boss:
         if self.time_since_last_shot < cooldown:
             return
 
-        if random.random() > self.fire_bias:
+        # Every frame off cooldown the boss feints (fake_charge_chance) or else fires
+        # (fire_bias). Over dt worth of frames, whichever happens first wins.
+        fake = self.fake_charge_chance
+        fire = (1.0 - fake) * self.fire_bias
+        if fake + fire <= 0:
+            return
+        happened = 1.0 - (1.0 - fake - fire) ** (dt * FPS)
+        roll = self.rng.random()
+        if roll >= happened:
+            return
+
+        # Fake charge
+        if roll < happened * fake / (fake + fire):
+            self.is_fake_charging = True
+            self.charge_start = now
+            self.fake_charges += 1
+            telemetry.emit(TEV_FAKE_CHARGE, ACTOR_BOSS)
             return
 
         # ---- REAL SHOT ----
-        charge = 0.25 if self.panic_mode else random.uniform(0.25, 0.85)
+        charge = 0.25 if self.panic_mode else self.rng.uniform(0.25, 0.85)
+        self.fire(charge, player, projectiles_out, now)
+
+    def fire(self, charge, player, projectiles_out, now):
         bullets_used = max(1, int(math.ceil(charge * self.max_ammo)))
         bullets_used = min(bullets_used, self.ammo)
 
@@ -710,18 +1715,2293 @@ class Boss:
         proj = Projectile(spawn_pos, aim_dir * speed, radius, damage, owner_tag="boss")
         projectiles_out.append(proj)
 
-        if boss_shot_sound:
-            boss_shot_sound.play()
+        play_sfx("boss_shot", self.pos.x)
 
         self.ammo -= bullets_used
+        self.shots_fired += 1
+        telemetry.emit(TEV_SHOT, ACTOR_BOSS, charge, bullets_used, damage, self.ammo)
         self.last_shot_time = now
         self.time_since_last_shot = 0.0
         self.visual_charge = 0.0
 
 
+# ---------- Bullet-hell phase ----------
+class BulletPool:
+    """
+    Fixed-capacity store for pattern bullets, one numpy row per field over every
+    slot (x, y, vx, vy, radius, damage, life, pattern index). Live bullets sit
+    packed at the front: volleys are written into the next free columns and
+    spent bullets are squeezed out into a second buffer that then takes over,
+    so firing, moving and colliding hundreds of bullets creates no Python
+    objects and every per-tick step is a handful of array operations.
+    """
+
+    FIELDS = 8
+
+    def __init__(self, capacity=BULLET_POOL_SIZE):
+        self.capacity = capacity
+        self.state = np.zeros((self.FIELDS, capacity))
+        self.spare = np.zeros((self.FIELDS, capacity))
+        self.tmp = np.empty((2, capacity))
+        self.mask = np.empty((3, capacity), dtype=bool)
+        self.count = 0
+        self.spawned = 0
+        self.dropped = 0
+        self.hits = 0
+
+    def emit(self, xs, ys, vxs, vys, kind):
+        """Appends a volley of len(xs) bullets of pattern `kind`; ys, vxs and vys may be scalars."""
+        n = self.count
+        k = min(len(xs), self.capacity - n)
+        self.dropped += len(xs) - k
+        if k <= 0:
+            return
+        st = self.state
+        for row, values in enumerate((xs, ys, vxs, vys)):
+            st[row, n:n + k] = values[:k] if np.ndim(values) else values
+        pattern = BULLET_PATTERNS[kind]
+        st[4, n:n + k] = pattern["radius"]
+        st[5, n:n + k] = pattern["damage"]
+        st[6, n:n + k] = BULLET_LIFETIME
+        st[7, n:n + k] = kind
+        self.count = n + k
+        self.spawned += k
+
+    def update(self, dt, target, arena=None):
+        """
+        Moves every bullet, drops the expired, off-screen and obstacle-bound ones
+        and tests the rest against target (the player). Returns [(x, y, damage)]
+        for the bullets that hit it.
+        """
+        n = self.count
+        if n == 0:
+            return ()
+        st = self.state[:, :n]
+        x, y, r, life = st[0], st[1], st[4], st[6]
+        a, b = self.tmp[0, :n], self.tmp[1, :n]
+        keep, hit, inside = self.mask[0, :n], self.mask[1, :n], self.mask[2, :n]
+        np.multiply(st[2], dt, out=a)
+        x += a
+        np.multiply(st[3], dt, out=a)
+        y += a
+        life -= dt
+
+        np.greater(life, 0.0, out=keep)
+        np.subtract(x, SCREEN_W * 0.5, out=a)
+        np.abs(a, out=a)
+        a -= r
+        np.less(a, SCREEN_W * 0.5, out=inside)
+        keep &= inside
+        np.subtract(y, SCREEN_H * 0.5, out=a)
+        np.abs(a, out=a)
+        a -= r
+        np.less(a, SCREEN_H * 0.5, out=inside)
+        keep &= inside
+        if arena is not None:
+            keep &= arena.distances(x, y) > r
+
+        # hit: (x - px)^2 + (y - py)^2 <= (r + player radius)^2
+        np.subtract(x, target.pos.x, out=a)
+        np.square(a, out=a)
+        np.subtract(y, target.pos.y, out=b)
+        np.square(b, out=b)
+        a += b
+        np.add(r, target.radius, out=b)
+        np.square(b, out=b)
+        np.less_equal(a, b, out=hit)
+        hit &= keep
+        hits = ()
+        if hit.any():
+            idx = np.flatnonzero(hit)
+            hits = list(zip(x[idx].tolist(), y[idx].tolist(), st[5, idx].tolist()))
+            self.hits += len(hits)
+            np.logical_not(hit, out=hit)
+            keep &= hit
+
+        m = np.count_nonzero(keep)
+        if m < n:
+            for row in range(self.FIELDS):
+                np.compress(keep, st[row], out=self.spare[row, :m])
+            self.state, self.spare = self.spare, self.state
+            self.count = m
+        return hits
+
+    def incoming(self, x, y, reach, horizon):
+        """
+        For the most imminent bullet that falls past row y within horizon seconds
+        passing closer than reach (plus its radius) to x: its offset from x there.
+        None if there is none.
+        """
+        n = self.count
+        if n == 0:
+            return None
+        st = self.state
+        fall, room = self.tmp[0, :n], self.tmp[1, :n]
+        ahead, soon = self.mask[0, :n], self.mask[1, :n]
+        np.subtract(y, st[1, :n], out=fall)
+        np.multiply(st[3, :n], horizon, out=room)
+        np.greater(fall, 0.0, out=ahead)
+        np.less(fall, room, out=soon)
+        ahead &= soon
+        if not ahead.any():
+            return None
+        idx = np.flatnonzero(ahead)
+        t = fall[idx] / st[3, idx]
+        miss = st[0, idx] + st[2, idx] * t - x
+        close = np.abs(miss) < reach + st[4, idx]
+        if not close.any():
+            return None
+        return float(miss[np.argmin(np.where(close, t, np.inf))])
+
+    def groups(self):
+        """(pattern index, x array, y array) for each pattern with live bullets, for the renderers."""
+        n = self.count
+        st = self.state
+        kinds = st[7, :n]
+        for kind in range(len(BULLET_PATTERNS)):
+            sel = kinds == kind
+            if sel.any():
+                yield kind, st[0, :n][sel], st[1, :n][sel]
+
+
+class PatternEmitter:
+    """
+    The boss's bullet-hell script: BULLET_PATTERNS in turn, each for its duration
+    with a pause between, firing whole volleys into the match's BulletPool. A
+    volley's positions and velocities are array math over precomputed angle
+    offsets. Spawn points never cross CENTER_Y, and the random parts (radial
+    phase, wall gaps) come from the boss rng so replays hold.
+    """
+
+    def __init__(self, rate=1.0):
+        self.rate = rate
+        self.index = 0
+        self.timer = BULLET_PATTERNS[0]["duration"]
+        self.pause = 0.0
+        self.cooldown = 0.0
+        self.angle = 0.0  # spiral heading
+        self.volleys = 0
+        self.offsets = []
+        for pattern in BULLET_PATTERNS:
+            if pattern["kind"] == "wall":
+                offsets = np.arange(pattern["spacing"] * 0.5, SCREEN_W, pattern["spacing"])
+            elif pattern["kind"] == "fan":
+                offsets = np.linspace(-0.5, 0.5, pattern["count"]) * pattern["spread"]
+            else:
+                offsets = np.arange(pattern["count"]) * (2.0 * math.pi / pattern["count"])
+            self.offsets.append(offsets)
+
+    def update(self, dt, boss, player):
+        if self.pause > 0.0:
+            self.pause -= dt
+            return
+        pattern = BULLET_PATTERNS[self.index]
+        interval = 1.0 / (pattern["rate"] * self.rate)
+        self.cooldown -= dt
+        while self.cooldown <= 0.0:
+            self.cooldown += interval
+            self._volley(self.index, boss, player, interval)
+        self.timer -= dt
+        if self.timer <= 0.0:
+            self.index = (self.index + 1) % len(BULLET_PATTERNS)
+            self.timer = BULLET_PATTERNS[self.index]["duration"]
+            self.pause = BULLET_PATTERN_PAUSE
+            self.cooldown = 0.0
+
+    def _volley(self, index, boss, player, interval):
+        pattern = BULLET_PATTERNS[index]
+        kind, speed, radius = pattern["kind"], pattern["speed"], pattern["radius"]
+        offsets = self.offsets[index]
+        self.volleys += 1
+        if kind == "wall":
+            # a row along the boss side of CENTER_Y falling into the player half, with one gap
+            gap = pattern["gap"]
+            start = boss.rng.uniform(PLAYER_RADIUS, SCREEN_W - PLAYER_RADIUS - gap)
+            xs = offsets[(offsets < start) | (offsets > start + gap)]
+            boss.bullets.emit(xs, CENTER_Y - radius - 1.0, 0.0, speed, index)
+            return
+        if kind == "spiral":
+            angles = offsets + self.angle
+            self.angle = (self.angle + pattern["spin"] * interval) % (2.0 * math.pi)
+        elif kind == "radial":
+            angles = offsets + boss.rng.uniform(0.0, offsets[1])
+        else:
+            angles = offsets + math.atan2(player.pos.y - boss.pos.y, player.pos.x - boss.pos.x)
+        dx, dy = np.cos(angles), np.sin(angles)
+        reach = boss.radius + radius + 4
+        ys = np.minimum(dy * reach + boss.pos.y, CENTER_Y - radius - 1.0)
+        boss.bullets.emit(dx * reach + boss.pos.x, ys, dx * speed, dy * speed, index)
+
+
+# ---------- Boss policies ----------
+class BossPolicy:
+    """
+    Decides where the boss goes and when it fires. Boss.update calls observe()
+    before its own bookkeeping, steer() before velocity smoothing (it must set
+    boss.target_vel), and shoot() after the position update, except in the
+    bullet-hell phase, where the PatternEmitter fires instead. boss.policy_out
+    is cleared after every think.
+    """
+
+    def observe(self, boss, player, projectiles):
+        pass
+
+    def steer(self, boss, dt, player, projectiles):
+        raise NotImplementedError
+
+    def shoot(self, boss, dt, player, projectiles, now):
+        raise NotImplementedError
+
+
+class HeuristicBossPolicy(BossPolicy):
+    """The hand-written boss: distance bands, movement commitment, retreats and fake charges."""
+
+    def steer(self, boss, dt, player, projectiles):
+        boss._update_learning(dt)
+        boss._update_proactive_retreat(dt)
+        boss._update_state(dt, player)
+        boss._update_movement(dt, player)
+
+    def shoot(self, boss, dt, player, projectiles, now):
+        boss._update_shooting(dt, player, projectiles, now)
+
+
+# ---- Planner: rollout lookahead ----
+class RolloutState:
+    """
+    Cheap clone of everything a rollout touches: boss and player kinematics plus
+    the player's shots in flight, copied into small arrays. Picklable, so plans
+    can be evaluated in a process pool.
+    """
+
+    def __init__(self, boss, player, projectiles):
+        self.boss_pos = np.array((boss.pos.x, boss.pos.y))
+        self.boss_vel = np.array((boss.vel.x, boss.vel.y))
+        self.boss_radius = boss.radius
+        self.move_speed = boss.move_speed * clamp(boss.aggression, 0.7, 1.4)
+        self.comfort_min = boss.comfort_min
+        self.comfort_max = boss.comfort_max
+        self.ammo = boss.ammo
+        self.max_ammo = boss.max_ammo
+        self.player_pos = np.array((player.pos.x, player.pos.y))
+        self.player_vel = np.array((boss.player_velocity.x, boss.player_velocity.y))
+        self.player_radius = player.radius
+        shots = [p for p in projectiles if p.owner == "player" and not p.is_dead()]
+        self.shot_pos = np.array([(p.pos.x, p.pos.y) for p in shots]).reshape(-1, 2)
+        self.shot_vel = np.array([(p.vel.x, p.vel.y) for p in shots]).reshape(-1, 2)
+        self.shot_radius = np.array([p.radius for p in shots])
+        self.shot_damage = np.array([p.damage for p in shots])
+        self.shot_life = np.array([p.life for p in shots])
+
+
+_planner_candidates = None
+
+
+def planner_candidates():
+    """(directions, charges) arrays covering every move/shot combination the planner scores."""
+    global _planner_candidates
+    if _planner_candidates is None:
+        angles = np.arange(PLANNER_DIRECTIONS) * (2 * math.pi / PLANNER_DIRECTIONS)
+        dirs = np.vstack([np.column_stack((np.cos(angles), np.sin(angles))), np.zeros((1, 2))])
+        charges = np.asarray(PLANNER_CHARGES, dtype=float)
+        _planner_candidates = (np.repeat(dirs, len(charges), axis=0), np.tile(charges, len(dirs)))
+    return _planner_candidates
+
+
+def evaluate_rollouts(state, dirs, charges, horizon=PLANNER_HORIZON, step=PLANNER_STEP):
+    """
+    Simulates every (direction, charge) candidate at once for `horizon` seconds and
+    returns a score per candidate: expected damage dealt minus damage taken, minus
+    time spent outside the comfort band and ammo spent. The player keeps moving
+    with the boss's estimate of their velocity.
+    """
+    k = len(dirs)
+    pos = np.tile(state.boss_pos, (k, 1))
+    vel = np.tile(state.boss_vel, (k, 1))
+    target = dirs * state.move_speed
+    ppos = state.player_pos.copy()
+    pvel = state.player_vel
+    r = state.boss_radius
+
+    # the candidate's own shot, fired now with the same lead as Boss._get_predicted_aim
+    fire = (charges > 0) & (state.ammo > 0)
+    bullets = np.minimum(np.maximum(1, np.ceil(charges * state.max_ammo)), max(state.ammo, 1))
+    eff = bullets / state.max_ammo
+    speed = BOSS_MIN_PROJ_SPEED + (BOSS_MAX_PROJ_SPEED - BOSS_MIN_PROJ_SPEED) * eff
+    s_rad = BOSS_MIN_PROJECTILE_RADIUS + (BOSS_MAX_PROJECTILE_RADIUS - BOSS_MIN_PROJECTILE_RADIUS) * eff
+    s_dmg = MIN_DAMAGE + (MAX_DAMAGE - MIN_DAMAGE) * eff
+    to_player = ppos - pos
+    lead = np.clip(np.hypot(to_player[:, 0], to_player[:, 1]) / speed, 0.05, 0.6)
+    aim = ppos + pvel * lead[:, None] - pos
+    aim /= np.maximum(np.hypot(aim[:, 0], aim[:, 1]), 1e-6)[:, None]
+    spos = pos + aim * (r + s_rad + 4)[:, None]
+    svel = aim * speed[:, None]
+    shot_live = fire.copy()
+
+    incoming_live = np.ones((k, len(state.shot_radius)), dtype=bool)
+    reach = (r + state.shot_radius) ** 2
+
+    dealt = np.zeros(k)
+    taken = np.zeros(k)
+    band = np.zeros(k)
+    lerp = 1.0 - (1.0 - 0.12) ** (step * FPS)  # Boss._update_velocity lerps 0.12 per frame
+    steps = max(1, int(horizon / step))
+    for i in range(steps):
+        t = (i + 1) * step
+        vel += (target - vel) * lerp
+        wall = np.abs(pos[:, 1] - CENTER_Y)
+        near = wall < 60
+        vel[near, 1] += 220 * (1 - wall[near] / 60) * step * np.where(pos[near, 1] < CENTER_Y, 1, -1)
+        pos += vel * step
+        np.clip(pos[:, 0], r, SCREEN_W - r, out=pos[:, 0])
+        np.clip(pos[:, 1], r, CENTER_Y - 1, out=pos[:, 1])
+
+        ppos = ppos + pvel * step
+        ppos[0] = clamp(ppos[0], state.player_radius, SCREEN_W - state.player_radius)
+        ppos[1] = clamp(ppos[1], max(state.player_radius, CENTER_Y + 1), SCREEN_H - state.player_radius)
+
+        spos += svel * step
+        d = spos - ppos
+        hit = shot_live & ((d[:, 0] ** 2 + d[:, 1] ** 2) <= (s_rad + state.player_radius) ** 2)
+        dealt += hit * s_dmg
+        shot_live &= ~hit
+
+        if len(reach):
+            in_pos = state.shot_pos + state.shot_vel * t
+            dx = pos[:, 0:1] - in_pos[None, :, 0]
+            dy = pos[:, 1:2] - in_pos[None, :, 1]
+            hits = incoming_live & (dx * dx + dy * dy <= reach) & (state.shot_life > t)
+            taken += (hits * state.shot_damage).sum(axis=1)
+            incoming_live &= ~hits
+
+        dist = np.hypot(pos[:, 0] - ppos[0], pos[:, 1] - ppos[1])
+        band += np.maximum(0.0, state.comfort_min - dist) + np.maximum(0.0, dist - state.comfort_max)
+
+    # players dodge, so only part of the damage a shot would deal is expected to land
+    return 0.6 * dealt - taken - 0.03 * band / steps - 0.8 * bullets * fire
+
+
+class PlannerBossPolicy(HeuristicBossPolicy):
+    """
+    Planner personality. Keeps the heuristic boss's state machine, learning and
+    retreats, but chooses committed_dir and shot charge by scoring rollouts from
+    a RolloutState snapshot. Each frame spends at most PLANNER_BUDGET_MS on
+    rollouts; an unfinished plan resumes next frame. With an executor (thread or
+    process pool) the whole plan runs off the game thread and is applied when done.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor if executor is not None else planner_executor
+        self.plan_timer = 0.0
+        self.plan = None      # (state, scores, next candidate index) while planning inline
+        self.future = None    # pending pool evaluation
+        self.planned_charge = 0.0
+
+    def steer(self, boss, dt, player, projectiles):
+        boss._update_learning(dt)
+        boss._update_proactive_retreat(dt)
+        boss._update_state(dt, player)
+
+        self.plan_timer -= dt
+        if self.plan is None and self.future is None and self.plan_timer <= 0:
+            self.plan_timer = PLANNER_REPLAN_INTERVAL
+            state = RolloutState(boss, player, projectiles)
+            dirs, charges = planner_candidates()
+            if self.executor is not None:
+                self.future = self.executor.submit(evaluate_rollouts, state, dirs, charges)
+            else:
+                self.plan = (state, np.empty(len(dirs)), 0)
+
+        if self.future is not None and self.future.done():
+            self._commit(boss, self.future.result())
+            self.future = None
+        elif self.plan is not None:
+            self._continue_plan(boss)
+
+        if boss.reset_duration > 0:
+            away = boss.pos - player.pos
+            boss.committed_dir = away.normalize() if away.length_squared() > 1e-6 else Vector2(0, -1)
+        boss.target_vel = boss.committed_dir * boss.move_speed * clamp(boss.aggression, 0.7, 1.4)
+
+    def _continue_plan(self, boss):
+        state, scores, start = self.plan
+        dirs, charges = planner_candidates()
+        deadline = time.perf_counter() + PLANNER_BUDGET_MS / 1000.0
+        while start < len(dirs):
+            end = min(start + PLANNER_CHUNK, len(dirs))
+            scores[start:end] = evaluate_rollouts(state, dirs[start:end], charges[start:end])
+            start = end
+            if planner_deterministic or time.perf_counter() >= deadline:
+                break
+        if start < len(dirs):
+            self.plan = (state, scores, start)
+        else:
+            self.plan = None
+            self._commit(boss, scores)
+
+    def _commit(self, boss, scores):
+        dirs, charges = planner_candidates()
+        best = int(np.argmax(scores))
+        boss.committed_dir = Vector2(float(dirs[best, 0]), float(dirs[best, 1]))
+        self.planned_charge = float(charges[best])
+
+    def shoot(self, boss, dt, player, projectiles, now):
+        boss.time_since_last_shot += dt
+        cooldown = boss._fire_cooldown()
+        if boss.reloading or boss.ammo <= 0 or boss.reset_duration > 0:
+            return
+        if boss.time_since_last_shot < cooldown or self.planned_charge <= 0:
+            return
+        charge = 0.25 if boss.panic_mode else self.planned_charge
+        self.planned_charge = 0.0  # one shot per plan
+        boss.fire(charge, player, projectiles, now)
+
+
+# optional pool shared by every planner boss (set from --planner-workers)
+planner_executor = None
+# one chunk per frame instead of a wall-clock budget, so seeded matches replay exactly
+planner_deterministic = False
+
+
+BOSS_OBS_SIZE = 19
+BOSS_ACT_SIZE = 4  # move x, move y, fire logit, charge logit
+
+
+def boss_observation(boss, player, projectiles, out):
+    """Fills out[:BOSS_OBS_SIZE] with the normalized features a learned boss sees."""
+    out[0] = (player.pos.x - boss.pos.x) / SCREEN_W
+    out[1] = (player.pos.y - boss.pos.y) / SCREEN_H
+    out[2] = player.vel.x / BOSS_MOVE_SPEED_BASE
+    out[3] = player.vel.y / BOSS_MOVE_SPEED_BASE
+    out[4] = boss.pos.x / SCREEN_W
+    out[5] = boss.pos.y / CENTER_Y
+    out[6] = boss.vel.x / boss.move_speed
+    out[7] = boss.vel.y / boss.move_speed
+    out[8] = boss.ammo / boss.max_ammo
+    out[9] = 1.0 if boss.reloading else 0.0
+    out[10] = boss.health / boss.max_health
+    out[11] = player.health / PLAYER_STARTING_HEALTH
+    out[12] = min(boss.time_since_last_shot, 3.0) / 3.0
+    out[13] = player.charge if player.charging else 0.0
+
+    # nearest incoming player shot
+    nearest = None
+    best = float("inf")
+    for p in projectiles:
+        if p.owner == "player":
+            d = p.pos.distance_squared_to(boss.pos)
+            if d < best:
+                nearest, best = p, d
+    if nearest is None:
+        out[14] = out[15] = out[16] = out[17] = out[18] = 0.0
+    else:
+        out[14] = (nearest.pos.x - boss.pos.x) / SCREEN_W
+        out[15] = (nearest.pos.y - boss.pos.y) / SCREEN_H
+        out[16] = nearest.vel.x / MAX_PROJ_SPEED
+        out[17] = nearest.vel.y / MAX_PROJ_SPEED
+        out[18] = nearest.radius / MAX_PROJ_RADIUS
+    return out
+
+
+class MLPBossPolicy(BossPolicy):
+    """
+    Learned boss: a tanh MLP over boss_observation(), evaluated with NumPy only.
+    Weights come from an .npz holding W0, b0, W1, b1, ...; the last layer has
+    BOSS_ACT_SIZE outputs. Single-boss inference reuses preallocated buffers;
+    infer_batch() runs one matrix pass for many headless arenas.
+    """
+
+    def __init__(self, layers):
+        if np is None:
+            raise RuntimeError("MLPBossPolicy needs numpy")
+        self.layers = [(np.ascontiguousarray(W, dtype=np.float32), np.ascontiguousarray(b, dtype=np.float32))
+                       for W, b in layers]
+        if self.layers[0][0].shape[0] != BOSS_OBS_SIZE or self.layers[-1][0].shape[1] != BOSS_ACT_SIZE:
+            raise ValueError(f"MLP must map {BOSS_OBS_SIZE} inputs to {BOSS_ACT_SIZE} outputs")
+        self._obs = np.zeros(BOSS_OBS_SIZE, dtype=np.float32)
+        self._acts = [np.zeros(W.shape[1], dtype=np.float32) for W, _ in self.layers]
+        self._batch_obs = np.zeros((0, BOSS_OBS_SIZE), dtype=np.float32)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n = sum(1 for k in data.files if k.startswith("W"))
+            return cls([(data[f"W{i}"], data[f"b{i}"]) for i in range(n)])
+
+    @classmethod
+    def random_init(cls, hidden=(32, 32), seed=None):
+        gen = np.random.default_rng(seed)
+        sizes = (BOSS_OBS_SIZE,) + tuple(hidden) + (BOSS_ACT_SIZE,)
+        return cls([(gen.normal(0.0, 1.0 / math.sqrt(a), (a, b)), np.zeros(b)) for a, b in zip(sizes, sizes[1:])])
+
+    def save(self, path):
+        arrays = {}
+        for i, (W, b) in enumerate(self.layers):
+            arrays[f"W{i}"] = W
+            arrays[f"b{i}"] = b
+        np.savez(path, **arrays)
+
+    def forward(self, obs):
+        x = obs
+        last = len(self.layers) - 1
+        for i, ((W, b), out) in enumerate(zip(self.layers, self._acts)):
+            np.dot(x, W, out=out)
+            out += b
+            if i < last:
+                np.tanh(out, out=out)
+            x = out
+        return x
+
+    def forward_batch(self, obs):
+        x = obs
+        last = len(self.layers) - 1
+        for i, (W, b) in enumerate(self.layers):
+            x = x @ W
+            x += b
+            if i < last:
+                np.tanh(x, out=x)
+        return x
+
+    def infer_batch(self, matches):
+        """One forward pass for every live boss in `matches` that runs this policy."""
+        live = [m for m in matches if m.boss.policy is self and m.boss.think_due(m.tick_dt)]
+        if not live:
+            return
+        if self._batch_obs.shape[0] < len(live):
+            self._batch_obs = np.zeros((len(live), BOSS_OBS_SIZE), dtype=np.float32)
+        obs = self._batch_obs[:len(live)]
+        for i, m in enumerate(live):
+            boss_observation(m.boss, m.player, m.projectiles, obs[i])
+        out = self.forward_batch(obs)
+        for i, m in enumerate(live):
+            m.boss.policy_out = out[i]
+
+    def observe(self, boss, player, projectiles):
+        if boss.policy_out is None:
+            # the output buffer is only read by this same boss later in its update
+            boss.policy_out = self.forward(boss_observation(boss, player, projectiles, self._obs))
+
+    def steer(self, boss, dt, player, projectiles):
+        boss._update_learning(dt)
+        out = boss.policy_out
+        move = Vector2(math.tanh(out[0]), math.tanh(out[1]))
+        if move.length_squared() > 1.0:
+            move.scale_to_length(1.0)
+        boss.committed_dir = move
+        boss.target_vel = move * boss.move_speed * clamp(boss.aggression, 0.7, 1.4)
+
+    def shoot(self, boss, dt, player, projectiles, now):
+        out = boss.policy_out
+        boss.time_since_last_shot += dt
+        cooldown = boss._fire_cooldown()
+        if boss.reloading or boss.ammo <= 0 or boss.time_since_last_shot < cooldown:
+            return
+        if out[2] > 0.0:
+            charge = 1.0 / (1.0 + math.exp(-float(out[3])))
+            boss.fire(clamp(charge, 0.1, 1.0), player, projectiles, now)
+
+
 def circle_collide(a_pos, a_rad, b_pos, b_rad):
-    return (a_pos - b_pos).length_squared() <= (a_rad + b_rad) ** 2
+    dx = a_pos.x - b_pos.x
+    dy = a_pos.y - b_pos.y
+    return dx * dx + dy * dy <= (a_rad + b_rad) ** 2
+
+
+def particle_is_dead(part):
+    return part.life <= 0
+
+
+def compact_alive(items, is_dead):
+    """Drops dead entries in place (keeps order) instead of rebuilding the list."""
+    j = 0
+    for item in items:
+        if not is_dead(item):
+            items[j] = item
+            j += 1
+    del items[j:]
+
+
+# ---------- Match simulation ----------
+DIFFICULTIES = ["Easy", "Normal", "Hard"]
+
+
+class PlayerControls:
+    """One tick of player input: held move direction, aim point and button edges."""
+
+    def __init__(self):
+        self.move = Vector2(0, 0)
+        self.aim = Vector2(SCREEN_W // 2, 0)
+        self.charge_pressed = False
+        self.charge_released = False
+        self.reload = False
+
+    def clear_edges(self):
+        self.charge_pressed = False
+        self.charge_released = False
+        self.reload = False
+
+
+class SimStepper:
+    """
+    Turns presented frames into fixed simulation ticks at a time scale. Slow
+    motion banks fractional ticks across frames; fast-forward runs several ticks
+    per frame and only the last state gets drawn; at max speed (inf) it ticks
+    until MAX_SPEED_FRAME_MS of the frame is spent, so speed is bounded only by
+    simulation throughput.
+    """
+
+    def __init__(self, scale=1.0, tick_dt=TICK_DT):
+        self.scale = scale
+        self.tick_dt = tick_dt
+        self.pending = 0.0
+
+    def reset(self):
+        self.pending = 0.0
+
+    def shift(self, steps):
+        i = TIME_SCALES.index(self.scale) if self.scale in TIME_SCALES else TIME_SCALES.index(1.0)
+        self.scale = TIME_SCALES[clamp(i + steps, 0, len(TIME_SCALES) - 1)]
+        self.pending = 0.0
+
+    def run(self, frame_dt, tick):
+        """Calls tick() for each tick due this frame until it returns False; returns ticks run."""
+        n = 0
+        if self.scale == float("inf"):
+            deadline = time.perf_counter() + MAX_SPEED_FRAME_MS / 1000.0
+            while True:
+                n += 1
+                if not tick() or time.perf_counter() >= deadline:
+                    return n
+        self.pending += frame_dt * self.scale
+        # a little slack so 16/17 ms frames at 1x give one tick each instead of 0/2 stutter
+        due = int(self.pending / self.tick_dt + 0.15)
+        if due > MAX_TICKS_PER_FRAME:
+            due = MAX_TICKS_PER_FRAME
+            self.pending = 0.0
+        else:
+            self.pending -= due * self.tick_dt
+        while n < due:
+            n += 1
+            if not tick():
+                break
+        return n
+
+
+class Match:
+    """
+    One arena: player, boss, projectiles and hit particles, advanced by step().
+    Time is simulated (now accumulates dt), so the same code drives the live
+    game and headless batch runs. Nothing here draws.
+    """
+
+    def __init__(self, difficulty="Normal", seed=None, policy=None, fx=True, personality=None,
+                 think_hz=None, think_phase=0.0, tuning=None, arena=None):
+        self.difficulty = difficulty
+        self.seed = seed
+        self.think_hz = think_hz
+        self.fx = fx
+        self.rng = random.Random(seed)
+        self.layout = ARENA_LAYOUT if arena is None else arena
+        self.arena = arena_field(self.layout)
+        self.bullets = BulletPool() if np is not None else None  # bullet-hell phase volleys
+        self.player = Player(Vector2(SCREEN_W // 2, CENTER_Y + (SCREEN_H - CENTER_Y) * 0.5), side="bottom",
+                             arena=self.arena)
+        self.boss = Boss(Vector2(SCREEN_W // 2, CENTER_Y * 0.5), difficulty=difficulty, rng=self.rng, policy=policy,
+                         personality=personality, think_hz=think_hz, think_phase=think_phase, tuning=tuning,
+                         arena=self.arena, bullets=self.bullets)
+        self.projectiles = []
+        self.particles = []
+        self.now = 0.0
+        self.tick = 0
+        self.fired = 0.0  # effective charge the player fired this tick
+        self.tick_dt = 0.0
+        self.effects = EFFECTS_LEVELS[0]  # cosmetic quality, set by the EffectsGovernor
+        self.checksums = None  # StateLog recording every tick, if any
+
+    @property
+    def result(self):
+        if self.boss.health <= 0:
+            return "victory"
+        if self.player.health <= 0:
+            return "defeat"
+        return None
+
+    def step(self, dt, controls):
+        self.step_player(dt, controls)
+        self.step_world(dt)
+
+    def step_player(self, dt, controls):
+        player = self.player
+        self.now += dt
+        self.tick += 1
+        self.tick_dt = dt
+        now = self.now
+
+        self.fired = 0.0
+        if controls.charge_pressed:
+            player.start_charge(now)
+        if controls.charge_released:
+            self.fired = self.release_charge(controls.aim)
+        if controls.reload and player.ammo < player.max_ammo and not player.reloading:
+            player.start_reload()
+
+        if player.charging:
+            player.charge = clamp((now - player.charge_start_time) / CHARGE_DURATION, 0.0, 1.0)
+        else:
+            player.charge = 0.0
+
+        player.update(dt, controls.move, now)
+
+    def step_world(self, dt):
+        player, boss = self.player, self.boss
+        boss.update(dt, player, self.projectiles, self.now)
+
+        arena = self.arena
+        for p in self.projectiles:
+            if arena is None:
+                p.update(dt)
+            elif arena.sweep(p, dt):
+                self.spawn_particles(p.pos, (170, 170, 190), count=PARTICLE_COUNT_HIT // 2)
+
+        # update particles
+        for part in self.particles:
+            part.update(dt)
+        compact_alive(self.particles, particle_is_dead)
+
+        # collisions
+        for p in self.projectiles:
+            if p.is_dead():
+                continue
+            if p.owner == "player":
+                if circle_collide(p.pos, p.radius, boss.pos, boss.radius):
+                    p.hit = True
+                    boss.apply_hit(p.damage)
+                    telemetry.emit(TEV_HIT, ACTOR_BOSS, p.damage, p.pos.x, p.pos.y, boss.health)
+                    self.spawn_particles(p.pos, (200, 120, 255), count=PARTICLE_COUNT_HIT)
+                    play_sfx("hit", p.pos.x)
+            elif p.owner == "boss":
+                if circle_collide(p.pos, p.radius, player.pos, player.radius):
+                    p.hit = True
+                    player.apply_hit(p.damage)
+                    telemetry.emit(TEV_HIT, ACTOR_PLAYER, p.damage, p.pos.x, p.pos.y, player.health)
+                    self.spawn_particles(p.pos, (255, 120, 80), count=PARTICLE_COUNT_HIT)
+                    play_sfx("hit", p.pos.x)
+
+        compact_alive(self.projectiles, Projectile.is_dead)
+
+        if self.bullets is not None and self.bullets.count:
+            for x, y, damage in self.bullets.update(dt, player, arena):
+                player.apply_hit(damage)
+                telemetry.emit(TEV_HIT, ACTOR_PLAYER, damage, x, y, player.health)
+                self.spawn_particles((x, y), (255, 120, 80), count=PARTICLE_COUNT_HIT // 2)
+                play_sfx("hit", x)
+
+        if self.checksums is not None:
+            self.checksums.record(self)
+
+    def spawn_particles(self, pos, base_color, count=PARTICLE_COUNT_HIT):
+        if not self.fx:
+            return
+        count = int(count * self.effects["particle_frac"] + 0.5)
+        cap = self.effects["max_particles"]
+        if cap is not None:
+            count = min(count, cap - len(self.particles))
+        # particles are cosmetic: they use the global generator, never the match rng
+        for i in range(count):
+            dirv = Vector2(random.uniform(-1, 1), random.uniform(-1, 1))
+            if dirv.length_squared() < 1e-6:
+                dirv = Vector2(0, -1)
+            else:
+                dirv = dirv.normalize()
+            speed = random.uniform(80, 280)
+            vel = dirv * speed
+            life = random.uniform(PARTICLE_LIFE_MIN, PARTICLE_LIFE_MAX)
+            size = random.uniform(2, 6)
+            color = (
+                clamp(base_color[0] + random.randint(-30, 30), 80, 255),
+                clamp(base_color[1] + random.randint(-30, 30), 80, 255),
+                clamp(base_color[2] + random.randint(-30, 30), 80, 255),
+            )
+            self.particles.append(Particle(Vector2(pos), vel, life, color, size))
 
+    def release_charge(self, aim_target):
+        """Fires the charged shot; returns the effective charge used (0 if nothing fired)."""
+        player, boss, now = self.player, self.boss, self.now
+        charge_val = player.end_charge(now)
+        if charge_val <= 0.001 or player.health <= 0:
+            return 0.0
+        # determine how many bullets this charge wants to consume
+        desired_slots = max(1, int(math.ceil(charge_val * player.max_ammo)))
+        if desired_slots >= player.max_ammo:
+            desired_slots = player.max_ammo
+        if player.ammo <= 0:
+            play_sfx("empty_click", player.pos.x)
+            return 0.0
+        # if not enough ammo, scale down the effective charge
+        bullets_used = min(desired_slots, player.ammo)
+        effective_charge = bullets_used / float(player.max_ammo)
+        aim = (aim_target - player.pos)
+        if effective_charge <= 0 or aim.length_squared() < 1e-6:
+            return 0.0
+        # spawn projectile and record shot immediately
+        radius = MIN_PROJ_RADIUS + (MAX_PROJ_RADIUS - MIN_PROJ_RADIUS) * effective_charge
+        damage = MIN_DAMAGE + (MAX_DAMAGE - MIN_DAMAGE) * effective_charge
+        proj = Projectile(player.pos + aim.normalize() * (player.radius + radius + 4),
+                          aim.normalize() * (MIN_PROJ_SPEED + (MAX_PROJ_SPEED - MIN_PROJ_SPEED) * effective_charge),
+                          radius,
+                          damage,
+                          owner_tag="player")
+        self.projectiles.append(proj)
+        boss.record_player(player.pos, now, player_fired=True)
+        player.ammo -= bullets_used
+        player.record_shot(now)
+        telemetry.emit(TEV_SHOT, ACTOR_PLAYER, charge_val, bullets_used, damage, player.ammo)
+        play_sfx("player_shot", player.pos.x)
+        # start per-bullet reload if magazine empty
+        if player.ammo <= 0:
+            player.start_reload()
+        return effective_charge
+
+
+class ScriptedPlayer:
+    """
+    Bot for headless matches. skill in [0, 1] scales aim error and lead,
+    how reliably incoming shots are dodged, and how heavily shots are charged.
+    """
+
+    def __init__(self, skill=0.5, seed=None):
+        self.skill = skill
+        self.rng = random.Random(seed)
+        self.controls = PlayerControls()
+        self.strafe = 1
+        self.strafe_timer = 0.0
+        self.charge_target = 0.0
+        self.aim_error = Vector2(0, 0)
+
+    def act(self, match, dt):
+        c = self.controls
+        c.clear_edges()
+        player, boss = match.player, match.boss
+        rng = self.rng
+
+        # strafe under the boss, changing direction now and then
+        self.strafe_timer -= dt
+        if self.strafe_timer <= 0:
+            self.strafe = rng.choice((-1, 1))
+            self.strafe_timer = rng.uniform(0.4, 1.4)
+        move_x = self.strafe
+        if abs(boss.pos.x - player.pos.x) > 220:
+            move_x = 1 if boss.pos.x > player.pos.x else -1
+
+        # dodge the most urgent incoming shot (better players react more often)
+        for p in match.projectiles:
+            if p.owner != "boss" or p.vel.y <= 0:
+                continue
+            t = (player.pos.y - p.pos.y) / p.vel.y
+            if 0 < t < 0.6:
+                miss_x = p.pos.x + p.vel.x * t - player.pos.x
+                if abs(miss_x) < player.radius + p.radius + 10 and rng.random() < 0.15 + 0.8 * self.skill:
+                    move_x = -1 if miss_x > 0 else 1
+                    break
+        else:
+            bullets = match.bullets
+            if bullets is not None and bullets.count:
+                miss_x = bullets.incoming(player.pos.x, player.pos.y, player.radius + 6, 0.4)
+                if miss_x is not None and rng.random() < 0.15 + 0.8 * self.skill:
+                    move_x = -1 if miss_x > 0 else 1
+        c.move.x = move_x
+        c.move.y = 0.0
+
+        # aim with lead and noise
+        if rng.random() < 0.05:
+            spread = 90.0 * (1.0 - self.skill)
+            self.aim_error.x = rng.uniform(-spread, spread)
+            self.aim_error.y = rng.uniform(-spread * 0.3, spread * 0.3)
+        dist = player.pos.distance_to(boss.pos)
+        lead = self.skill * dist / MAX_PROJ_SPEED
+        c.aim.x = boss.pos.x + boss.vel.x * lead + self.aim_error.x
+        c.aim.y = boss.pos.y + boss.vel.y * lead + self.aim_error.y
+
+        # charge, then release once the target charge is reached
+        if not player.charging:
+            if player.ammo > 0 and player.health > 0:
+                c.charge_pressed = True
+                self.charge_target = rng.uniform(0.1, 0.25 + 0.5 * self.skill)
+        elif match.now - player.charge_start_time >= self.charge_target * CHARGE_DURATION:
+            c.charge_released = True
+        return c
+
+
+def run_headless_batch(n_arenas=64, seconds=60.0, difficulty="Normal", policy=None, skill=0.5, seed=0,
+                       dt=1.0 / FPS, personality=None, think_hz=None, budget_ms=BOSS_THINK_BUDGET_MS,
+                       checksum_log=None):
+    """
+    Steps n_arenas independent matches in lockstep without a display. Boss thinks
+    are staggered across arenas; a shared MLPBossPolicy is evaluated once per tick
+    for every boss due to think. With checksum_log, arena i logs its per-tick
+    checksums to numbered_path(checksum_log, i). Returns the finished matches and
+    timing stats.
+    """
+    global sfx_enabled, ai_budget
+    sfx_enabled = False
+    ai_budget = AIBudget(budget_ms)
+    matches = [Match(difficulty, seed=seed + i, policy=policy, fx=False, personality=personality,
+                     think_hz=think_hz, think_phase=i / n_arenas)
+               for i in range(n_arenas)]
+    bots = [ScriptedPlayer(skill, seed=seed + 100003 + i) for i in range(n_arenas)]
+    if checksum_log:
+        for i, m in enumerate(matches):
+            m.checksums = StateLog(numbered_path(checksum_log, i), {"headless": i, "seed": m.seed,
+                                                                    "difficulty": difficulty})
+    batched = policy if isinstance(policy, MLPBossPolicy) else None
+    ticks = int(seconds / dt)
+    infer_time = 0.0
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        live = [(m, b) for m, b in zip(matches, bots) if m.result is None]
+        if not live:
+            break
+        ai_budget.begin_frame()
+        for m, bot in live:
+            m.step_player(dt, bot.act(m, dt))
+        if batched:
+            ti = time.perf_counter()
+            batched.infer_batch([m for m, _ in live])
+            infer_time += time.perf_counter() - ti
+        for m, _ in live:
+            m.step_world(dt)
+    elapsed = time.perf_counter() - t0
+    for m in matches:
+        if m.checksums:
+            m.checksums.close()
+    arena_ticks = sum(m.tick for m in matches)
+    stats = {
+        "arena_ticks": arena_ticks,
+        "wall_s": elapsed,
+        "us_per_arena_tick": 1e6 * elapsed / max(1, arena_ticks),
+        "infer_us_per_boss": 1e6 * infer_time / max(1, arena_ticks),
+        "results": collections.Counter(m.result or "timeout" for m in matches),
+        "deferred_thinks": ai_budget.deferred,
+    }
+    return matches, stats
+
+
+def measure_tick_allocations(ticks=1200, warmup=300, seed=1, difficulty="Normal"):
+    """
+    Steady-state allocation check. Steps a headless match against a scripted player
+    under tracemalloc and returns (median bytes allocated transiently per tick,
+    net bytes retained per tick). Ticks that fire or land a shot legitimately create
+    objects, so the median is what reflects the per-tick update path.
+    """
+    import tracemalloc
+    global sfx_enabled
+    sfx_enabled = False
+    match = Match(difficulty, seed=seed, fx=True)
+    bot = ScriptedPlayer(0.5, seed=seed)
+    dt = 1.0 / FPS
+    for _ in range(warmup):
+        ai_budget.begin_frame()
+        match.step(dt, bot.act(match, dt))
+    transient = []
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    for _ in range(ticks):
+        if match.result:
+            break
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        ai_budget.begin_frame()
+        match.step(dt, bot.act(match, dt))
+        _, peak = tracemalloc.get_traced_memory()
+        transient.append(peak - before)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    transient.sort()
+    n = max(1, len(transient))
+    return transient[len(transient) // 2] if transient else 0, (end - start) / n
+
+
+def paired_mean_ci(a, b, alpha, resamples=AI_LOD_RESAMPLES, seed=0):
+    """Percentile bootstrap (1 - 2 alpha) interval of the mean of b[i] - a[i]."""
+    diffs = [y - x for x, y in zip(a, b)]
+    n = len(diffs)
+    rng = random.Random(seed)
+    means = sorted(sum(rng.choices(diffs, k=n)) / n for _ in range(resamples))
+    return means[int(alpha * resamples)], means[min(resamples - 1, int((1.0 - alpha) * resamples))]
+
+
+def match_metrics(matches):
+    return {
+        "duration": [m.now for m in matches],
+        "player_hp": [m.player.health for m in matches],
+        "boss_hp_frac": [m.boss.health / m.boss.max_health for m in matches],
+        "boss_shots": [m.boss.shots_fired for m in matches],
+        "boss_fake_charges": [m.boss.fake_charges for m in matches],
+        "boss_y": [m.boss.pos.y for m in matches],
+    }
+
+
+def ai_lod_equivalence(n_matches=800, think_hz=BOSS_THINK_HZ, seconds=90.0, difficulty="Normal", alpha=0.05,
+                       budget_ms=AI_LOD_BUDGET_MS):
+    """
+    Equivalence test that thinking at think_hz plays like thinking every tick. The
+    same seeds and scripted players run every tick without a budget, at think_hz
+    without a budget, and at think_hz in AI_LOD_BATCH-arena batches sharing a
+    budget_ms think budget, so deferred thinks are covered too. A metric is
+    equivalent when the bootstrap (1 - 2 alpha) interval of its paired mean
+    difference lies inside +-AI_LOD_MARGINS (TOST at level alpha); too few matches
+    give wide intervals and fail. The budgeted run fails if no think was deferred.
+    Returns (passed, report rows, deferred thinks).
+    """
+    base, _ = run_headless_batch(n_matches, seconds, difficulty, think_hz=0, budget_ms=float("inf"))
+    lod, _ = run_headless_batch(n_matches, seconds, difficulty, think_hz=think_hz, budget_ms=float("inf"))
+    budgeted, deferred = [], 0
+    for start in range(0, n_matches, AI_LOD_BATCH):
+        batch, stats = run_headless_batch(min(AI_LOD_BATCH, n_matches - start), seconds, difficulty, seed=start,
+                                          think_hz=think_hz, budget_ms=budget_ms)
+        budgeted += batch
+        deferred += stats["deferred_thinks"]
+    rows = []
+    passed = deferred > 0
+    base_m = match_metrics(base)
+    for run, matches in (("lod", lod), ("budget", budgeted)):
+        for name, values in match_metrics(matches).items():
+            lo, hi = paired_mean_ci(base_m[name], values, alpha)
+            margin = AI_LOD_MARGINS[name]
+            ok = -margin < lo and hi < margin
+            passed &= ok
+            rows.append((run, name, sum(base_m[name]) / n_matches, sum(values) / n_matches, lo, hi, margin, ok))
+    return passed, rows, deferred
+
+
+def bullet_hell_benchmark(seconds=30.0, difficulty="Hard", seed=0, draw=True, stress=BULLET_BENCH_STRESS,
+                          policy=None):
+    """
+    Frame-time check for the bullet-hell phase. A headless match starts with the
+    boss at the phase threshold and its pattern rate set to stress, and is
+    played by a scripted player who is healed after every tick, so patterns run
+    for the whole benchmark and every bullet keeps being tested against the
+    player; the boss is held above zero health. A frame is one tick plus (with
+    draw) a software render of the arena. Returns timings in ms, pool counters
+    and how often the boss changed heading (it keeps thinking while it fires).
+    """
+    global sfx_enabled
+    sfx_enabled = False
+    match = Match(difficulty, seed=seed, policy=policy, fx=True)
+    if match.bullets is None:
+        raise RuntimeError("the bullet-hell phase needs numpy")
+    player, boss = match.player, match.boss
+    boss.health = int(boss.max_health * BULLET_HELL_HEALTH)
+    boss.pattern_rate = stress
+    bot = ScriptedPlayer(0.6, seed=seed)
+    surf = pygame.Surface((SCREEN_W, SCREEN_H)) if draw else None
+    dt = TICK_DT
+    sim_ms, frame_ms, live = [], [], []
+    heading = None
+    replans = 0
+    for _ in range(int(seconds / dt)):
+        t0 = time.perf_counter()
+        ai_budget.begin_frame()
+        match.step(dt, bot.act(match, dt))
+        t1 = time.perf_counter()
+        if surf is not None:
+            draw_match(surf, match, bot.controls.aim)
+        t2 = time.perf_counter()
+        sim_ms.append((t1 - t0) * 1000.0)
+        frame_ms.append((t2 - t0) * 1000.0)
+        live.append(match.bullets.count)
+        if (boss.committed_dir.x, boss.committed_dir.y) != heading:
+            heading = (boss.committed_dir.x, boss.committed_dir.y)
+            replans += 1
+        player.health = PLAYER_STARTING_HEALTH
+        boss.health = max(boss.health, 1)
+    pct = lambda values, q: sorted(values)[min(len(values) - 1, int(q * len(values)))]
+    return {
+        "frames": len(frame_ms),
+        "sim_p50": pct(sim_ms, 0.5), "sim_p99": pct(sim_ms, 0.99),
+        "frame_p50": pct(frame_ms, 0.5), "frame_p99": pct(frame_ms, 0.99), "frame_max": max(frame_ms),
+        "live_mean": sum(live) / len(live), "live_max": max(live),
+        "spawned_per_s": match.bullets.spawned / match.now,
+        "hits": match.bullets.hits, "dropped": match.bullets.dropped,
+        "replans_per_s": (replans - 1) / match.now,
+    }
+
+
+# ---------- Replays ----------
+REPLAY_MAGIC = b"TFRPL001"
+REPLAY_TICK = struct.Struct("<bbddB")  # move x, move y, aim x, aim y (exact for bot aim too), edge flags
+REPLAY_CHARGE_PRESSED, REPLAY_CHARGE_RELEASED, REPLAY_RELOAD = 1, 2, 4
+
+
+def replay_header(match, policy_spec=None):
+    """Everything besides the per-tick controls that a replay needs to rebuild the match."""
+    tuning = flat_tuning()
+    return {"difficulty": match.difficulty, "seed": match.seed, "tick_dt": TICK_DT,
+            "think_hz": BOSS_THINK_HZ if match.think_hz is None else match.think_hz, "boss_policy": policy_spec, "tuning": tuning,
+            "personality": match.boss.personality, "arena": match.layout}
+
+
+class ReplayRecorder:
+    """
+    Writes one replay file per match: a JSON header (seed, difficulty, boss
+    parameters) and the controls of every fixed tick. Matches are seeded and step
+    a fixed tick without wall-clock budgets, so seed + controls replay exactly.
+    """
+
+    def __init__(self, directory, policy_spec=None):
+        self.directory = directory
+        self.policy_spec = policy_spec
+        os.makedirs(directory, exist_ok=True)
+        self.header = None
+        self.ticks = bytearray()
+        self.last_path = None
+
+    def begin_match(self, match):
+        self.header = replay_header(match, self.policy_spec)
+        self.ticks = bytearray()
+
+    def record(self, controls):
+        flags = ((REPLAY_CHARGE_PRESSED if controls.charge_pressed else 0)
+                 | (REPLAY_CHARGE_RELEASED if controls.charge_released else 0)
+                 | (REPLAY_RELOAD if controls.reload else 0))
+        self.ticks += REPLAY_TICK.pack(int(controls.move.x), int(controls.move.y),
+                                       controls.aim.x, controls.aim.y, flags)
+
+    def end_match(self, match=None):
+        """Writes the file; with the finished match, its outcome goes in the header for --check-replay."""
+        if self.header is None:
+            return None
+        if match is not None:
+            self.header["outcome"] = replay_outcome(match)
+        name = time.strftime("replay_%Y%m%d_%H%M%S") + f"_{self.header['seed']}.tfr"
+        self.last_path = os.path.join(self.directory, name)
+        header = json.dumps(self.header).encode()
+        with open(self.last_path, "wb") as fh:
+            fh.write(REPLAY_MAGIC)
+            fh.write(struct.pack("<I", len(header)))
+            fh.write(header)
+            fh.write(self.ticks)
+        self.header = None
+        return self.last_path
+
+
+def load_replay(path):
+    """Returns (header, list of PlayerControls, one per tick)."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if data[:len(REPLAY_MAGIC)] != REPLAY_MAGIC:
+        raise ValueError(f"{path}: not a TILTFIRE replay")
+    pos = len(REPLAY_MAGIC)
+    (size,) = struct.unpack_from("<I", data, pos)
+    header = json.loads(data[pos + 4:pos + 4 + size])
+    ticks = []
+    for mx, my, ax, ay, flags in REPLAY_TICK.iter_unpack(data[pos + 4 + size:]):
+        c = PlayerControls()
+        c.move = Vector2(mx, my)
+        c.aim = Vector2(ax, ay)
+        c.charge_pressed = bool(flags & REPLAY_CHARGE_PRESSED)
+        c.charge_released = bool(flags & REPLAY_CHARGE_RELEASED)
+        c.reload = bool(flags & REPLAY_RELOAD)
+        ticks.append(c)
+    return header, ticks
+
+
+def replay_match(header, fx=True):
+    """A fresh Match set up exactly as the recorded one started."""
+    return Match(header["difficulty"], seed=header["seed"], policy=load_policy(header.get("boss_policy")),
+                 fx=fx, personality=header.get("personality"), think_hz=header.get("think_hz"),
+                 tuning=header.get("tuning"), arena=header.get("arena", "Open"))
+
+
+def replay_outcome(match):
+    """How a match ended, as stored in its replay header: result, length and a hash of the final state."""
+    return {"result": match.result, "ticks": match.tick,
+            "state": hashlib.blake2b(state_record(match), digest_size=8).hexdigest()}
+
+
+def replay_mismatches(header, match):
+    """[(what, recorded, replayed)] where a re-simulated match differs from its recording."""
+    found = []
+    if header.get("personality") not in (None, match.boss.personality):
+        found.append(("personality", header["personality"], match.boss.personality))
+    for key, value in header.get("outcome", {}).items():
+        replayed = replay_outcome(match)[key]
+        if replayed != value:
+            found.append((key, value, replayed))
+    return found
+
+
+def simulate_replay(path, checksum_log=None):
+    """Re-runs a replay headlessly at full speed and returns the finished Match (optionally logging checksums)."""
+    global sfx_enabled, ai_budget, planner_deterministic
+    sfx_enabled = False
+    ai_budget = AIBudget(float("inf"))
+    planner_deterministic = True
+    header, ticks = load_replay(path)
+    match = replay_match(header, fx=False)
+    if checksum_log:
+        match.checksums = StateLog(checksum_log, {"replay": os.path.basename(path), "seed": header["seed"],
+                                                  "difficulty": header["difficulty"]})
+    try:
+        for controls in ticks:
+            match.step(header["tick_dt"], controls)
+    finally:
+        if match.checksums:
+            match.checksums.close()
+    return match
+
+
+# ---------- State checksums ----------
+STATE_LOG_MAGIC = b"TFSUM001"
+STATE_FIELDS = (
+    "now", "tick",
+    "player.pos.x", "player.pos.y", "player.vel.x", "player.vel.y", "player.input_mag", "player.charging",
+    "player.charge_start_time", "player.charge", "player.hit_timer", "player.health", "player.ammo",
+    "player.reloading", "player.reload_timer", "player.last_shot_time",
+    "boss.pos.x", "boss.pos.y", "boss.vel.x", "boss.vel.y", "boss.target_vel.x", "boss.target_vel.y",
+    "boss.committed_dir.x", "boss.committed_dir.y", "boss.player_velocity.x", "boss.player_velocity.y",
+    "boss.health", "boss.aggression", "boss.ammo", "boss.reloading", "boss.reload_timer", "boss.last_shot_time",
+    "boss.time_since_last_shot", "boss.state_timer", "boss.move_commit_timer", "boss.reset_timer",
+    "boss.reset_duration", "boss.is_fake_charging", "boss.panic_mode", "boss.visual_charge", "boss.shots_fired",
+    "boss.fake_charges", "boss.player_shot_count", "boss.player_hit_count", "boss.think_timer", "boss.think_dt",
+    "boss.hit_timer", "boss.vibrate_timer", "boss.vibrate_offset.x", "boss.vibrate_offset.y",
+)
+# packed after STATE_FIELDS as doubles: values that need more than an attribute lookup (emitter
+# and planner fields are 0, next -1, when the boss has none), then int64 hashes of the rest
+STATE_EXTRAS = ("boss.state", "projectiles.count", "bullets.count",
+                "emitter.index", "emitter.timer", "emitter.pause", "emitter.cooldown", "emitter.angle",
+                "planner.plan_timer", "planner.planned_charge", "planner.next")
+STATE_HASHES = ("rng", "projectiles", "bullets", "planner.scores", "policy_out", "danger")
+STATE_NAMES = STATE_FIELDS + STATE_EXTRAS + STATE_HASHES
+STATE_RECORD = struct.Struct(f"<{len(STATE_FIELDS) + len(STATE_EXTRAS)}d{len(STATE_HASHES)}q")
+PROJECTILE_STATE = struct.Struct("<7d3B")
+RNG_STATE = struct.Struct("<625I")  # Mersenne Twister words plus position, from Random.getstate()
+GAUSS_STATE = struct.Struct("<?d")  # the cached second gauss() value, if any
+_state_values = operator.attrgetter(*STATE_FIELDS)
+
+
+def state_record(match):
+    """The match's simulation state as one fixed-size record (cosmetic particles excluded)."""
+    boss = match.boss
+    crc = 0
+    for p in match.projectiles:
+        crc = zlib.crc32(PROJECTILE_STATE.pack(p.pos.x, p.pos.y, p.vel.x, p.vel.y, p.radius, p.damage, p.life,
+                                               p.hit, p.owner == "player", p.bounces), crc)
+    bullets = match.bullets
+    n = bullets.count if bullets is not None else 0
+    bullet_crc = 0
+    for row in range(BulletPool.FIELDS if n else 0):
+        bullet_crc = zlib.crc32(bullets.state[row, :n], bullet_crc)
+
+    em = boss.emitter
+    emitter = (em.index, em.timer, em.pause, em.cooldown, em.angle) if em is not None else (0, 0.0, 0.0, 0.0, 0.0)
+    planner = (0.0, 0.0, -1)
+    scores_crc = 0
+    policy = boss.policy
+    if isinstance(policy, PlannerBossPolicy):
+        step = -1
+        if policy.plan is not None:
+            _, scores, step = policy.plan
+            scores_crc = zlib.crc32(scores[:step])
+        elif policy.future is not None:
+            step = -2  # evaluating on the pool
+        planner = (policy.plan_timer, policy.planned_charge, step)
+    out_crc = zlib.crc32(boss.policy_out) if boss.policy_out is not None else 0
+    danger_crc = 0
+    if boss.danger is not None:
+        danger_crc = zlib.crc32(boss.danger.grid)
+        for idx, w, stamped in boss.danger.stamps.values():
+            danger_crc = zlib.crc32(w, zlib.crc32(idx, zlib.crc32(struct.pack("<d", stamped), danger_crc)))
+
+    _, mt, gauss_next = match.rng.getstate()
+    rng_crc = zlib.crc32(GAUSS_STATE.pack(gauss_next is not None, gauss_next or 0.0), zlib.crc32(RNG_STATE.pack(*mt)))
+    return STATE_RECORD.pack(*_state_values(match), BOSS_STATES.index(boss.state), len(match.projectiles), n,
+                             *emitter, *planner,
+                             rng_crc, crc, bullet_crc, scores_crc, out_crc, danger_crc)
+
+
+class StateLog:
+    """
+    Per-tick checksum side log for one match. Every tick's state_record() is
+    chained into a rolling 64-bit hash, so two runs agree up to the tick where
+    they diverge and differ at every tick after it. The hash and the record are
+    deflated into the log; fields that don't change compress to almost nothing.
+    """
+
+    def __init__(self, path, source=None):
+        self.path = path
+        self.fh = open(path, "wb")
+        header = json.dumps({"fields": STATE_NAMES, "source": source or {}}).encode()
+        self.fh.write(STATE_LOG_MAGIC)
+        self.fh.write(struct.pack("<I", len(header)))
+        self.fh.write(header)
+        self.z = zlib.compressobj(6)
+        self.rolling = bytes(8)
+        self.ticks = 0
+
+    def record(self, match):
+        rec = state_record(match)
+        self.rolling = hashlib.blake2b(self.rolling + rec, digest_size=8).digest()
+        self.fh.write(self.z.compress(self.rolling + rec))
+        self.ticks += 1
+
+    def close(self):
+        if self.fh:
+            self.fh.write(self.z.flush())
+            self.fh.close()
+            self.fh = None
+
+
+# set from --checksum-log for live play: run_game logs its k-th match to numbered_path(checksum_log, k)
+checksum_log = None
+
+
+def numbered_path(path, index):
+    """path itself for index 0, else with -index before the extension (one checksum log per arena or match)."""
+    if index == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index}{ext}"
+
+
+def load_state_log(path):
+    """Returns (header, list of (rolling hash, record bytes), one per tick)."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if data[:len(STATE_LOG_MAGIC)] != STATE_LOG_MAGIC:
+        raise ValueError(f"{path}: not a TILTFIRE state log")
+    pos = len(STATE_LOG_MAGIC)
+    (size,) = struct.unpack_from("<I", data, pos)
+    header = json.loads(data[pos + 4:pos + 4 + size])
+    body = zlib.decompress(data[pos + 4 + size:])
+    n = 8 + STATE_RECORD.size
+    return header, [(body[i:i + 8], body[i + 8:i + n]) for i in range(0, len(body), n)]
+
+
+def bisect_state_logs(path_a, path_b):
+    """
+    Finds where two runs of the same match diverge: a binary search for the first
+    tick whose rolling hash differs. Returns (that tick or None, [(field, value a,
+    value b)] at it, (ticks in a, ticks in b)).
+    """
+    header_a, a = load_state_log(path_a)
+    header_b, b = load_state_log(path_b)
+    if header_a["fields"] != header_b["fields"]:
+        raise ValueError("the logs record different fields (written by different versions of the log format)")
+    n = min(len(a), len(b))
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if a[mid][0] == b[mid][0]:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == n:
+        return None, [], (len(a), len(b))
+    values_a = STATE_RECORD.unpack(a[lo][1])
+    values_b = STATE_RECORD.unpack(b[lo][1])
+    diffs = [(name, va, vb) for name, va, vb in zip(header_a["fields"], values_a, values_b) if va != vb]
+    return lo + 1, diffs, (len(a), len(b))
+
+
+# ---------- Replay export ----------
+EXPORT_FPS = 60
+EXPORT_CHUNK_FRAMES = 300        # frames per worker job (5 s at 60 FPS)
+
+
+def export_frame_count(header, ticks, fps):
+    """Frames in an export at fps: frame 0 is the starting state, the last one the final tick."""
+    return int(len(ticks) * header["tick_dt"] * fps + 1e-9) + 1
+
+
+def rgb_surface(size):
+    """24-bit surface whose pixels are stored R, G, B, so surfarray views of it are packed RGB24."""
+    masks = (0xFF, 0xFF00, 0xFF0000, 0) if sys.byteorder == "little" else (0xFF0000, 0xFF00, 0xFF, 0)
+    return pygame.Surface(size, 0, 24, masks)
+
+
+def write_rgb(stream, surf):
+    """
+    Appends surf to a raw RGB24 stream. The surfarray view is transposed to rows x
+    columns x RGB; when the surface pitch has no padding that view is contiguous
+    and is written straight from the surface memory, otherwise it takes one copy.
+    """
+    view = pygame.surfarray.pixels3d(surf).transpose(1, 0, 2)
+    stream.write(view.data if view.flags.c_contiguous else np.ascontiguousarray(view).data)
+    del view  # unlocks surf for the next frame's drawing
+
+
+def export_chunk(job):
+    """
+    Renders frames [first, last) of a replay (runs in a pool worker). The match is
+    rebuilt from the replay and stepped without drawing up to the chunk's first
+    frame; the global generator (hit particles) is seeded from the match seed, so
+    every chunk sees exactly the state a single pass would.
+    """
+    global sfx_enabled, ai_budget, planner_deterministic
+    path, fmt, target, first, last, fps, size = job
+    sfx_enabled = False
+    ai_budget = AIBudget(float("inf"))
+    planner_deterministic = True
+    header, ticks = load_replay(path)
+    tick_dt = header["tick_dt"]
+    random.seed(header["seed"])
+    match = replay_match(header)
+    frame = rgb_surface((SCREEN_W, SCREEN_H))
+    out = frame if size == (SCREEN_W, SCREEN_H) else rgb_surface(size)
+    stream = open(target, "wb") if fmt == "raw" else None
+    try:
+        for i in range(first, last):
+            due = min(len(ticks), int(i / fps / tick_dt + 1e-6))
+            while match.tick < due:
+                match.step(tick_dt, ticks[match.tick])
+            aim = ticks[match.tick - 1].aim if match.tick else Vector2(SCREEN_W // 2, 0)
+            draw_match(frame, match, aim, DIVIDER_FLASH_DURATION - match.tick * tick_dt)
+            if out is not frame:
+                pygame.transform.smoothscale(frame, size, out)
+            if stream:
+                write_rgb(stream, out)
+            else:
+                pygame.image.save(out, target % i)
+    finally:
+        if stream:
+            stream.close()
+    return last - first
+
+
+def export_replay(path, out, fmt="png", fps=EXPORT_FPS, size=(SCREEN_W, SCREEN_H), workers=None,
+                  chunk_frames=EXPORT_CHUNK_FRAMES, log=print):
+    """
+    Renders a replay offline at a fixed fps and size, either as out/frame_NNNNNN.png
+    or as one raw RGB24 stream in `out` ("-" for stdout, e.g. into
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -r FPS -i -). The frame range is split
+    into chunks rendered on a process pool; raw chunks go to temporary files that
+    are appended to the stream in order as soon as they and their predecessors are
+    done. Returns the number of frames.
+    """
+    import concurrent.futures, shutil, tempfile
+    if fmt == "raw" and np is None:
+        raise RuntimeError("raw export needs numpy (pygame.surfarray)")
+    header, ticks = load_replay(path)
+    n_frames = export_frame_count(header, ticks, fps)
+    chunks = [(i, min(i + chunk_frames, n_frames)) for i in range(0, n_frames, chunk_frames)]
+    if fmt == "png":
+        os.makedirs(out, exist_ok=True)
+        targets = [os.path.join(out, "frame_%06d.png")] * len(chunks)
+    else:
+        tmp = tempfile.mkdtemp(prefix="tiltfire-export-")
+        targets = [os.path.join(tmp, f"chunk-{k:05d}.rgb") for k in range(len(chunks))]
+    jobs = [(path, fmt, target, a, b, fps, tuple(size)) for target, (a, b) in zip(targets, chunks)]
+    executor = concurrent.futures.ProcessPoolExecutor(workers) if workers != 0 else None
+    stream = None
+    try:
+        if fmt == "raw":
+            stream = sys.stdout.buffer if out == "-" else open(out, "wb")
+        done = 0
+        for target, n in zip(targets, executor.map(export_chunk, jobs) if executor else map(export_chunk, jobs)):
+            done += n
+            if stream:
+                with open(target, "rb") as fh:
+                    shutil.copyfileobj(fh, stream)
+                os.remove(target)
+            if log:
+                log(f"export: {done}/{n_frames} frames")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if stream and stream is not sys.stdout.buffer:
+            stream.close()
+        if fmt == "raw":
+            shutil.rmtree(tmp, ignore_errors=True)
+    return n_frames
+
+
+# ---------- Difficulty tuner ----------
+def simulation_fingerprint():
+    """Hash of this source file: any edit to the game invalidates cached tuning results."""
+    with open(os.path.abspath(__file__), "rb") as fh:
+        return hashlib.sha1(fh.read()).hexdigest()
+
+
+def tuning_job_key(fingerprint, difficulty, tuning, think_hz, skill, seed, seconds):
+    # key on the parameters a match at this difficulty actually sees, so overrides
+    # that only touch other difficulties (or restate defaults) share cache entries
+    params = {"difficulty": tuned(DIFFICULTY_PARAMS, difficulty, tuning)}
+    for name in PERSONALITY_PARAMS:
+        params[name] = tuned(PERSONALITY_PARAMS, name, tuning)
+    blob = json.dumps([fingerprint, difficulty, params, think_hz, skill, seed, seconds], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def tuning_match(job):
+    """
+    Plays one seeded headless match for the tuner (runs in a pool worker). The job
+    carries the full parameter set (flat_tuning) and think rate, so the outcome never
+    depends on module globals a spawned worker wouldn't share with the parent.
+    """
+    global sfx_enabled, ai_budget, planner_deterministic
+    difficulty, tuning, think_hz, skill, seed, seconds = job
+    sfx_enabled = False
+    ai_budget = AIBudget(float("inf"))
+    planner_deterministic = True
+    match = Match(difficulty, seed=seed, fx=False, think_hz=think_hz, tuning=tuning,
+                  arena="Open")  # targets are for the open arena
+    bot = ScriptedPlayer(skill, seed=seed + 100003)
+    dt = 1.0 / FPS
+    for _ in range(int(seconds / dt)):
+        if match.result:
+            break
+        match.step(dt, bot.act(match, dt))
+    return {"result": match.result or "timeout", "duration": match.now,
+            "boss_hp_frac": match.boss.health / match.boss.max_health}
+
+
+class TuningCache:
+    """
+    Append-only JSON-lines file of match outcomes keyed by tuning_job_key. Sweeps
+    that revisit a parameter set and seed reuse the stored outcome; concurrent
+    sweeps may share one file since each entry is a single appended line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            with open(path) as fh:
+                for line in fh:
+                    try:
+                        key, value = json.loads(line)
+                    except ValueError:
+                        continue  # torn line from an interrupted sweep
+                    self.entries[key] = value
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put_many(self, items):
+        with open(self.path, "a") as fh:
+            for key, value in items:
+                self.entries[key] = value
+                fh.write(json.dumps([key, value]) + "\n")
+
+
+def tuning_error(outcomes, difficulty):
+    """Squared error of win rate per skill level plus relative error of mean match length."""
+    target = TUNER_TARGETS[difficulty]
+    err = 0.0
+    durations = []
+    for skill, want in zip(TUNER_SKILLS, target["win_rate"]):
+        rows = outcomes[skill]
+        err += (sum(r["result"] == "victory" for r in rows) / len(rows) - want) ** 2
+        durations.extend(r["duration"] for r in rows)
+    mean = sum(durations) / len(durations)
+    return err + ((mean - target["duration"]) / target["duration"]) ** 2
+
+
+def evaluate_tunings(candidates, difficulties, seeds, seconds, cache, executor, think_hz=None):
+    """
+    Total tuning error of each candidate override set over every difficulty being
+    tuned, with the boss thinking at `think_hz` (default BOSS_THINK_HZ).
+    """
+    fingerprint = simulation_fingerprint()
+    think_hz = BOSS_THINK_HZ if think_hz is None else think_hz
+    jobs, keys = [], []
+    for overrides in candidates:
+        tuning = flat_tuning(overrides)
+        for difficulty in difficulties:
+            for skill in TUNER_SKILLS:
+                for seed in range(seeds):
+                    jobs.append((difficulty, tuning, think_hz, skill, seed, seconds))
+                    keys.append(tuning_job_key(fingerprint, difficulty, tuning, think_hz, skill, seed, seconds))
+    results = [cache.get(key) for key in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+    if todo:
+        pending = [jobs[i] for i in todo]
+        done = executor.map(tuning_match, pending, chunksize=max(1, len(pending) // 64)) if executor \
+            else map(tuning_match, pending)
+        fresh = []
+        for i, outcome in zip(todo, done):
+            results[i] = outcome
+            fresh.append((keys[i], outcome))
+        cache.put_many(fresh)
+    errors = []
+    per_candidate = len(difficulties) * len(TUNER_SKILLS) * seeds
+    for c in range(len(candidates)):
+        rows = results[c * per_candidate:(c + 1) * per_candidate]
+        err = 0.0
+        for d, difficulty in enumerate(difficulties):
+            block = rows[d * len(TUNER_SKILLS) * seeds:(d + 1) * len(TUNER_SKILLS) * seeds]
+            outcomes = {skill: block[k * seeds:(k + 1) * seeds] for k, skill in enumerate(TUNER_SKILLS)}
+            err += tuning_error(outcomes, difficulty)
+        errors.append(err)
+    return errors
+
+
+def tune_parameters(difficulties, keys=None, iterations=12, population=8, seeds=16,
+                    seconds=TUNER_MATCH_SECONDS, cache_path="tuning_cache.jsonl", workers=None,
+                    search_seed=0, think_hz=None, log=print):
+    """
+    Searches "Row.key" overrides of DIFFICULTY_PARAMS / PERSONALITY_PARAMS (by
+    default the multipliers of each tuned difficulty) with a seeded (1+lambda)
+    mutation search. Candidates are scored on the same match seeds (common random
+    numbers) and rounded, so repeated or overlapping sweeps hit the cache. Matches
+    run at `think_hz` (default BOSS_THINK_HZ), which is part of the cache key.
+    Returns (best overrides, best error, cache).
+    """
+    import concurrent.futures
+    if not keys:
+        keys = [f"{d}.{k}" for d in difficulties for k in DIFFICULTY_PARAMS[d]]
+    tables = dict(DIFFICULTY_PARAMS, **PERSONALITY_PARAMS)
+
+    def current(key):
+        row, name = key.split(".")
+        return tables[row][name]
+
+    def clip(key, value):
+        lo, hi = TUNER_BOUNDS[key.split(".")[1]]
+        value = clamp(value, lo, hi)
+        return int(round(value)) if isinstance(current(key), int) else round(value, 3)
+
+    rng = random.Random(search_seed)
+    cache = TuningCache(cache_path)
+    executor = concurrent.futures.ProcessPoolExecutor(workers) if workers != 0 else None
+    try:
+        best = {key: current(key) for key in keys}
+        best_err = evaluate_tunings([best], difficulties, seeds, seconds, cache, executor, think_hz)[0]
+        log(f"baseline error {best_err:.4f}")
+        step = 0.25  # fraction of each parameter's range
+        for it in range(iterations):
+            candidates = []
+            for _ in range(population):
+                cand = dict(best)
+                for key in keys:
+                    if rng.random() < 0.6:
+                        lo, hi = TUNER_BOUNDS[key.split(".")[1]]
+                        cand[key] = clip(key, cand[key] + rng.gauss(0.0, step * (hi - lo)))
+                candidates.append(cand)
+            errors = evaluate_tunings(candidates, difficulties, seeds, seconds, cache, executor, think_hz)
+            i = min(range(len(errors)), key=errors.__getitem__)
+            if errors[i] < best_err:
+                best, best_err = candidates[i], errors[i]
+            else:
+                step *= 0.7
+            log(f"iteration {it + 1}/{iterations}: error {best_err:.4f}  step {step:.3f}  "
+                f"cache {cache.hits} hits / {cache.misses} simulated")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return best, best_err, cache
+
+
+def apply_tuning(overrides):
+    """Writes "Row.key" overrides into DIFFICULTY_PARAMS / PERSONALITY_PARAMS."""
+    for key, value in overrides.items():
+        row, name = key.split(".")
+        table = DIFFICULTY_PARAMS if row in DIFFICULTY_PARAMS else PERSONALITY_PARAMS
+        table[row][name] = value
+
+
+# ---------- Frame pacing ----------
+class GCController:
+    """
+    "managed" mode keeps CPython's cyclic collector out of gameplay frames. At
+    match start everything alive (assets, the new match) is collected and then
+    gc.freeze()d into the permanent generation, and the gen0 threshold is raised
+    so per-frame churn rarely triggers a pass. Transitions to the menu or end
+    screen unfreeze, restore the thresholds and collect fully, where a pause is
+    invisible. "default" leaves the collector alone.
+    """
+
+    def __init__(self, mode="default"):
+        self.mode = mode
+        self.thresholds = gc.get_threshold()
+
+    def match_started(self):
+        if self.mode == "managed":
+            gc.collect()
+            gc.freeze()
+            gc.set_threshold(GC_MATCH_THRESHOLD, *self.thresholds[1:])
+
+    def match_ended(self):
+        if self.mode == "managed":
+            gc.unfreeze()
+            gc.set_threshold(*self.thresholds)
+            gc.collect()
+
+
+gc_control = GCController()
+
+STUTTER_CAUSES = ("gc", "input", "sim", "draw", "present", "os")
+
+
+class FrameMonitor:
+    """
+    Stutter detector. The frame loop marks the end of each stage (input, sim,
+    draw, present); gc.callbacks timestamps every collection. A frame longer than
+    STUTTER_THRESHOLD budgets is blamed on GC if collections cover at least half
+    its overrun, else on the stage furthest above its running average if that
+    covers half, else on the OS (oversleeping, scheduling, the compositor).
+    """
+
+    def __init__(self, budget_ms=1000.0 / FPS, log=print):
+        self.budget_ms = budget_ms
+        self.log = log
+        self.frames = collections.deque(maxlen=STUTTER_HISTORY)
+        self.avg = dict.fromkeys(STUTTER_CAUSES[1:5], 0.0)
+        self.stages = dict.fromkeys(STUTTER_CAUSES[1:5], 0.0)
+        self.causes = collections.Counter()
+        self.gc_ms = 0.0        # collector time inside the current frame
+        self.gc_total_ms = 0.0
+        self.gc_max_ms = 0.0
+        self.gc_passes = [0, 0, 0]
+        self.frame_start = None
+        self.mark_time = None
+        self.gc_start = None
+        gc.callbacks.append(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            ms = (time.perf_counter() - self.gc_start) * 1000.0
+            self.gc_start = None
+            self.gc_ms += ms
+            self.gc_total_ms += ms
+            self.gc_max_ms = max(self.gc_max_ms, ms)
+            self.gc_passes[info["generation"]] += 1
+
+    def begin_frame(self):
+        """Call right after the frame-rate wait; closes out and judges the previous frame."""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self._judge((now - self.frame_start) * 1000.0)
+        self.frame_start = self.mark_time = now
+        self.gc_ms = 0.0
+        for stage in self.stages:
+            self.stages[stage] = 0.0
+
+    def mark(self, stage):
+        if self.frame_start is None:
+            return
+        now = time.perf_counter()
+        self.stages[stage] += (now - self.mark_time) * 1000.0
+        self.mark_time = now
+
+    def reset(self):
+        """Forget the frame in flight (menus and end screens are not gameplay frames)."""
+        self.frame_start = None
+
+    def _judge(self, frame_ms):
+        self.frames.append(frame_ms)
+        over = frame_ms - self.budget_ms
+        if frame_ms > self.budget_ms * STUTTER_THRESHOLD:
+            excess, stage = max((self.stages[s] - self.avg[s], s) for s in self.stages)
+            if self.gc_ms >= over * 0.5:
+                cause, culprit_ms = "gc", self.gc_ms
+            elif excess >= over * 0.5:
+                cause, culprit_ms = stage, excess
+            else:
+                cause, culprit_ms = "os", over - max(0.0, excess)
+            self.causes[cause] += 1
+            telemetry.emit(TEV_STUTTER, ACTOR_PLAYER, frame_ms, STUTTER_CAUSES.index(cause), self.gc_ms, culprit_ms)
+            if self.log:
+                stages = " ".join(f"{s}={ms:.1f}" for s, ms in self.stages.items())
+                self.log(f"stutter {frame_ms:.1f} ms -> {cause} ({culprit_ms:.1f} ms)  gc={self.gc_ms:.1f} {stages}")
+        else:
+            for s, ms in self.stages.items():
+                self.avg[s] += (ms - self.avg[s]) * 0.05
+
+    def report(self):
+        if not self.frames:
+            return "no gameplay frames"
+        times = sorted(self.frames)
+        pct = lambda q: times[min(len(times) - 1, int(q * len(times)))]
+        causes = ", ".join(f"{c} {n}" for c, n in self.causes.most_common()) or "none"
+        return (f"frames {len(times)}  p50 {pct(0.5):.1f} ms  p95 {pct(0.95):.1f} ms  p99 {pct(0.99):.1f} ms  "
+                f"max {times[-1]:.1f} ms\n"
+                f"stutters: {causes}\n"
+                f"gc: {sum(self.gc_passes)} passes (gen0/1/2 {self.gc_passes[0]}/{self.gc_passes[1]}/"
+                f"{self.gc_passes[2]}), {self.gc_total_ms:.1f} ms total, worst {self.gc_max_ms:.1f} ms")
+
+
+# set from --stutter-log; the frame loops mark stages on it when present
+frame_monitor = None
+
+
+# ---------- Renderers ----------
+class SurfaceRenderer:
+    """
+    Software backend: everything is drawn onto the display surface. Below
+    scale 1.0 the world layer is drawn into a smaller offscreen surface and
+    stretched up first; the HUD is always drawn at full resolution.
+    """
+
+    def __init__(self, flags=0):
+        self.surface = pygame.display.set_mode((SCREEN_W, SCREEN_H), flags)
+        self.scale = 1.0
+        self.world = {}  # scale -> offscreen surface
+
+    def draw_match(self, match, aim, divider_flash_timer=0.0, status=None):
+        if self.scale >= 1.0:
+            draw_match(self.surface, match, aim, divider_flash_timer, status)
+            return
+        world = self.world.get(self.scale)
+        if world is None:
+            world = self.world[self.scale] = pygame.Surface(
+                (max(1, int(SCREEN_W * self.scale)), max(1, int(SCREEN_H * self.scale))))
+        draw_world(world, match, aim, divider_flash_timer, self.scale)
+        pygame.transform.scale(world, (SCREEN_W, SCREEN_H), self.surface)
+        draw_hud(self.surface, match, status)
+
+    def present(self):
+        pygame.display.flip()
+
+    def snapshot(self):
+        return self.surface.copy()
+
+    def blurred(self, frame, amt=6):
+        return blur_surface(frame, amt)
+
+    def ui_frame(self, backdrop=None):
+        """Starts a menu frame (optionally over a blurred() backdrop); menus draw on self.surface."""
+        if backdrop is not None:
+            self.surface.blit(backdrop, (0, 0))
+
+    def present_ui(self):
+        pygame.display.flip()
+
+
+class TextureRenderer:
+    """
+    pygame._sdl2 backend. Projectile discs, particle stamps, charge rings, the
+    player and boss bodies and HUD text are uploaded once as textures and drawn
+    as quads with color/alpha modulation. Menus still draw onto self.surface,
+    which is uploaded once per menu frame. accelerated=0 selects SDL's software
+    renderer (works under the dummy video driver).
+    """
+
+    DISC_RADIUS = 64
+    TEXT_CACHE_SIZE = 256
+
+    def __init__(self, accelerated=-1, vsync=False):
+        from pygame._sdl2 import video
+        self.video = video
+        os.environ.setdefault("SDL_RENDER_SCALE_QUALITY", "linear")  # read by SDL as each texture is created
+        self.window = video.Window("TILTFIRE", size=(SCREEN_W, SCREEN_H))
+        self.renderer = video.Renderer(self.window, accelerated=accelerated, vsync=vsync, target_texture=True)
+        self.renderer.draw_blend_mode = pygame.BLENDMODE_BLEND
+        self.surface = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
+        self.ui_texture = self.texture(self.surface)
+        self.backdrop = None
+        self.readback = None
+
+        r = self.DISC_RADIUS
+        disc = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+        pygame.draw.circle(disc, (255, 255, 255), (r, r), r)
+        self.disc = self.texture(disc)
+
+        body = pygame.Surface((BOSS_RADIUS * 2, BOSS_RADIUS * 2), pygame.SRCALPHA)
+        pygame.draw.circle(body, BOSS_COLOR, (BOSS_RADIUS, BOSS_RADIUS), BOSS_RADIUS)
+        pygame.draw.circle(body, (20, 20, 20), (BOSS_RADIUS, BOSS_RADIUS), BOSS_RADIUS, 3)
+        self.boss_body = self.texture(body)
+        self.player_bodies = {col: self.texture(self._player_sprite(col)) for col in (PLAYER_COLOR, (255, 255, 255))}
+
+        bar = pygame.Surface((420, 18), pygame.SRCALPHA)
+        pygame.draw.rect(bar, (40, 40, 40), bar.get_rect(), border_radius=6)
+        self.bar_back = self.texture(bar)
+        bar = pygame.Surface((420, 18), pygame.SRCALPHA)
+        pygame.draw.rect(bar, (10, 10, 10), bar.get_rect(), width=2, border_radius=6)
+        self.bar_frame = self.texture(bar)
+        bar = pygame.Surface((414, 12), pygame.SRCALPHA)
+        pygame.draw.rect(bar, (255, 255, 255), bar.get_rect(), border_radius=5)
+        self.bar_fill = self.texture(bar)
+
+        self.rings = {}  # outer radius -> white ring texture, built on first use
+        self.text = {}   # (string, color) -> texture
+        self.scale = 1.0
+        self.world = {}  # scale -> low-resolution world target texture
+        self.obstacles = {}  # ArenaField -> full-screen texture of its obstacles
+
+    def texture(self, surf):
+        tex = self.video.Texture.from_surface(self.renderer, surf)
+        tex.blend_mode = pygame.BLENDMODE_BLEND
+        return tex
+
+    @staticmethod
+    def _player_sprite(color):
+        size = PLAYER_RADIUS
+        if PLAYER_SHAPE == "triangle":
+            c = int(size * 1.2) + 2
+            surf = pygame.Surface((c * 2, c * 2), pygame.SRCALPHA)
+            pts = [(c + size * 1.2, c), (c - size * 0.7, c + size * 0.7), (c - size * 0.7, c - size * 0.7)]
+            pygame.draw.polygon(surf, color, pts)
+            pygame.draw.polygon(surf, (20, 20, 20), pts, width=2)
+        else:
+            surf = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            surf.fill(color)
+            pygame.draw.rect(surf, (20, 20, 20), surf.get_rect(), width=2)
+        return surf
+
+    def _ring(self, radius):
+        tex = self.rings.get(radius)
+        if tex is None:
+            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, (255, 255, 255), (radius, radius), radius, width=6)
+            tex = self.rings[radius] = self.texture(surf)
+        return tex
+
+    def _text(self, text, color):
+        tex = self.text.get((text, color))
+        if tex is None:
+            if len(self.text) >= self.TEXT_CACHE_SIZE:
+                self.text.clear()  # reload percentages churn through strings; start over rather than track age
+            tex = self.text[(text, color)] = self.texture(font.render(text, True, color))
+        return tex
+
+    def _stamp(self, tex, x, y, radius, color, alpha=255):
+        tex.color = color
+        tex.alpha = alpha
+        tex.draw(dstrect=(x - radius, y - radius, radius * 2, radius * 2))
+
+    def draw_match(self, match, aim, divider_flash_timer=0.0, status=None):
+        ren = self.renderer
+        if self.scale >= 1.0:
+            self._draw_world(match, aim, divider_flash_timer)
+        else:
+            world = self.world.get(self.scale)
+            if world is None:
+                world = self.world[self.scale] = self.video.Texture(
+                    ren, (max(1, int(SCREEN_W * self.scale)), max(1, int(SCREEN_H * self.scale))), target=True)
+                world.blend_mode = pygame.BLENDMODE_NONE
+            ren.target = world
+            ren.scale = (self.scale, self.scale)  # world drawing stays in logical coordinates
+            self._draw_world(match, aim, divider_flash_timer)
+            ren.scale = (1.0, 1.0)
+            ren.target = None
+            world.draw(dstrect=(0, 0, SCREEN_W, SCREEN_H))
+        self._draw_health_bar(match.boss)
+        for text, color, (x, y) in hud_lines(match, status):
+            tex = self._text(text, color)
+            tex.draw(dstrect=(x, y, tex.width, tex.height))
+
+    def _draw_world(self, match, aim, divider_flash_timer):
+        ren = self.renderer
+        player, boss = match.player, match.boss
+        ren.draw_color = (*BACKGROUND_COLOR, 255)
+        ren.clear()
+        if divider_flash_timer > 0 and int(divider_flash_timer * DIVIDER_FLASH_FREQ) % 2 == 0:
+            ren.draw_color = (*DIVIDER_COLOR, 255)
+            ren.fill_rect((0, CENTER_Y - DIVIDER_THICKNESS // 2, SCREEN_W, DIVIDER_THICKNESS))
+        if match.arena is not None:
+            tex = self.obstacles.get(match.arena)
+            if tex is None:
+                layer = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
+                draw_obstacles(layer, match.arena)
+                tex = self.obstacles[match.arena] = self.texture(layer)
+            tex.draw(dstrect=(0, 0, SCREEN_W, SCREEN_H))
+
+        disc = self.disc
+        glow_min = match.effects["glow_min_radius"]
+        for p in match.projectiles:
+            x, y = int(p.pos.x), int(p.pos.y)
+            if p.radius >= glow_min:
+                self._stamp(disc, x, y, int(p.radius * 2.4), PROJECTILE_GLOW)
+            self._stamp(disc, x, y, int(p.radius), (255, 255, 255))
+        if match.bullets is not None and match.bullets.count:
+            disc.alpha = 255
+            for kind, xs, ys in match.bullets.groups():
+                points = list(zip(xs.astype(int).tolist(), ys.astype(int).tolist()))
+                r = BULLET_PATTERNS[kind]["radius"]
+                for color, size in ((BULLET_PATTERNS[kind]["color"], r), ((255, 255, 255), max(1, r // 2))):
+                    disc.color = color
+                    for x, y in points:
+                        disc.draw(dstrect=(x - size, y - size, size * 2, size * 2))
+
+        bx, by = boss.pos.x + boss.vibrate_offset.x, boss.pos.y + boss.vibrate_offset.y
+        self.boss_body.draw(dstrect=(bx - boss.radius, by - boss.radius, boss.radius * 2, boss.radius * 2))
+        if boss.visual_charge > 0:
+            ring_r = int(boss.radius + 12 + boss.visual_charge * 28)
+            self._stamp(self._ring(ring_r), bx, by, ring_r, (255, 80, 80), int(120 + 100 * boss.visual_charge))
+
+        if player.charge > 0:
+            ring_r = int(player.radius + 6 + player.charge * 20)
+            self._stamp(self._ring(ring_r), int(player.pos.x), int(player.pos.y), ring_r, CHARGE_COLOR, 90)
+        aim_dir = aim - player.pos
+        if aim_dir.length_squared() >= 1e-4:
+            angle = math.degrees(math.atan2(aim_dir.y, aim_dir.x))
+        elif PLAYER_SHAPE == "triangle" and player.vel.length_squared() > 1e-6:
+            angle = math.degrees(math.atan2(player.vel.y, player.vel.x))
+        else:
+            angle = -90.0 if PLAYER_SHAPE == "triangle" else 0.0
+        body = self.player_bodies[(255, 255, 255) if player.hit_timer > 0 else PLAYER_COLOR]
+        w, h = body.width, body.height
+        body.draw(dstrect=(player.pos.x - w / 2, player.pos.y - h / 2, w, h), angle=angle)
+
+        for part in match.particles:
+            if part.life <= 0:
+                continue
+            frac = clamp(part.life / part.max_life, 0.0, 1.0)
+            size = max(1, int(part.size * (0.6 + 0.4 * frac)))
+            self._stamp(disc, int(part.pos.x), int(part.pos.y), size, part.color, int(255 * frac))
+
+        if player.hit_timer > 0 and match.effects["hit_flash"]:
+            ren.draw_color = (*PLAYER_HIT_TINT, int(180 * (player.hit_timer / HIT_FLASH_TIME)))
+            ren.fill_rect((0, 0, SCREEN_W, SCREEN_H))
+
+    def _draw_health_bar(self, boss):
+        x, y = (SCREEN_W - 420) // 2, 14
+        self.bar_back.draw(dstrect=(x, y, 420, 18))
+        frac = clamp(boss.health / boss.max_health, 0.0, 1.0)
+        fill_w = int(frac * 414)
+        if fill_w > 0:
+            self.bar_fill.color = (80, 220, 120) if frac > 0.6 else (240, 200, 60) if frac > 0.3 else (240, 80, 80)
+            self.bar_fill.draw(srcrect=(0, 0, fill_w, 12), dstrect=(x + 3, y + 3, fill_w, 12))
+        self.bar_frame.draw(dstrect=(x, y, 420, 18))
+
+    def present(self):
+        self.renderer.present()
+
+    def snapshot(self):
+        # to_surface() without a destination leaks the surface it creates (pygame 2.6);
+        # read into one kept surface and hand out a normal copy
+        if self.readback is None:
+            self.readback = pygame.Surface((SCREEN_W, SCREEN_H), 0, 32)
+        return self.renderer.to_surface(surface=self.readback).copy()
+
+    def blurred(self, frame, amt=6):
+        """
+        Blur as a GPU downscale into small target textures, stretched back up when
+        drawn. Halving in steps lets linear filtering average 2x2 texels each time
+        (one big step would just point-sample), like smoothscale does on the CPU.
+        """
+        tex = self.video.Texture.from_surface(self.renderer, frame)
+        tex.blend_mode = pygame.BLENDMODE_NONE  # framebuffer alpha is meaningless
+        w, h = SCREEN_W, SCREEN_H
+        target_w, target_h = max(1, SCREEN_W // max(1, amt)), max(1, SCREEN_H // max(1, amt))
+        while w > target_w or h > target_h:
+            w, h = max(target_w, w // 2), max(target_h, h // 2)
+            small = self.video.Texture(self.renderer, (w, h), target=True)
+            small.blend_mode = pygame.BLENDMODE_NONE
+            self.renderer.target = small
+            tex.draw(dstrect=(0, 0, w, h))
+            tex = small
+        self.renderer.target = None
+        return tex
+
+    def ui_frame(self, backdrop=None):
+        self.backdrop = backdrop
+        if backdrop is not None:
+            self.surface.fill((0, 0, 0, 0))
+
+    def present_ui(self):
+        ren = self.renderer
+        ren.draw_color = (*BACKGROUND_COLOR, 255)
+        ren.clear()
+        if self.backdrop is not None:
+            self.backdrop.draw(dstrect=(0, 0, SCREEN_W, SCREEN_H))
+        self.ui_texture.update(self.surface)
+        self.ui_texture.draw()
+        ren.present()
+
+
+class LoadGovernor:
+    """
+    Steps a degradation level between 0 (full quality) and max_level from the
+    measured work time of each frame. An average of frame time is compared with
+    the 1/FPS budget; the level rises when frames run over `high` of it and falls
+    only once they stay under `low`, waiting `settle` frames after each change so
+    it can't flap.
+    """
+
+    def __init__(self, max_level, high, low, settle, budget_ms=1000.0 / FPS):
+        self.max_level = max_level
+        self.high = budget_ms * high
+        self.low = budget_ms * low
+        self.settle_frames = settle
+        self.level = 0
+        self.avg_ms = 0.0
+        self.settle = settle
+
+    def step(self, work_ms):
+        self.avg_ms += (work_ms - self.avg_ms) * 0.1
+        if self.settle > 0:
+            self.settle -= 1
+            return self.level
+        level = self.level
+        if self.avg_ms > self.high:
+            level = min(self.max_level, level + 1)
+        elif self.avg_ms < self.low:
+            level = max(0, level - 1)
+        if level != self.level:
+            self.level = level
+            self.settle = self.settle_frames
+        return self.level
+
+
+class ResolutionScaler(LoadGovernor):
+    """Dynamic resolution: each level renders the arena DRS_STEP smaller, down to min_scale."""
+
+    def __init__(self, budget_ms=1000.0 / FPS, min_scale=DRS_MIN_SCALE):
+        super().__init__(int(round((1.0 - min_scale) / DRS_STEP)), DRS_HIGH, DRS_LOW, DRS_SETTLE_FRAMES, budget_ms)
+
+    @property
+    def scale(self):
+        return round(1.0 - self.level * DRS_STEP, 2)
+
+    def update(self, work_ms):
+        self.step(work_ms)
+        return self.scale
+
+
+class EffectsGovernor(LoadGovernor):
+    """
+    Effects LOD: each level is a row of EFFECTS_LEVELS shedding more cosmetic
+    cost. Its thresholds sit below the resolution scaler's, so effects go first.
+    """
+
+    def __init__(self, budget_ms=1000.0 / FPS):
+        super().__init__(len(EFFECTS_LEVELS) - 1, FX_HIGH, FX_LOW, FX_SETTLE_FRAMES, budget_ms)
+
+    def update(self, work_ms):
+        return EFFECTS_LEVELS[self.step(work_ms)]
+
+
+def draw_match(surf, match, aim, divider_flash_timer=0.0, status=None):
+    """Draws one gameplay frame (arena, entities, HUD) onto surf with the software renderer."""
+    draw_world(surf, match, aim, divider_flash_timer)
+    draw_hud(surf, match, status)
+
+
+def draw_world(surf, match, aim, divider_flash_timer=0.0, scale=1.0):
+    """The arena layer. Positions stay logical; scale maps them onto a smaller surf."""
+    player, boss = match.player, match.boss
+    fx = match.effects
+    surf.fill(BACKGROUND_COLOR)
+    if divider_flash_timer > 0:
+        phase = int(divider_flash_timer * DIVIDER_FLASH_FREQ) % 2
+        if phase == 0:
+            pygame.draw.line(
+                surf,
+                DIVIDER_COLOR,
+                (0, CENTER_Y * scale),
+                (surf.get_width(), CENTER_Y * scale),
+                max(1, int(DIVIDER_THICKNESS * scale))
+            )
+    if match.arena is not None:
+        draw_obstacles(surf, match.arena, scale)
+
+    glow_min = fx["glow_min_radius"]
+    for p in match.projectiles:
+        p.draw(surf, scale, p.radius >= glow_min)
+    if match.bullets is not None and match.bullets.count:
+        draw_bullets(surf, match.bullets, scale)
+
+    boss.draw(surf, scale)
+
+    aim_dir = aim - player.pos
+    player.draw(surf, aim_dir, player.charge, scale)
+
+    # draw particles (above player/boss for nice effect)
+    for part in match.particles:
+        part.draw(surf, scale)
+
+    if player.hit_timer > 0 and fx["hit_flash"]:
+        s = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
+        alpha = int(180 * (player.hit_timer / HIT_FLASH_TIME))
+        s.fill((PLAYER_HIT_TINT[0], PLAYER_HIT_TINT[1], PLAYER_HIT_TINT[2], alpha))
+        surf.blit(s, (0, 0))
+
+
+def draw_obstacles(surf, arena, scale=1.0):
+    edge = max(1, int(3 * scale))
+    for shape in arena.shapes:
+        if shape[0] == "pillar":
+            _, x, y, r = shape
+            pygame.draw.circle(surf, OBSTACLE_COLOR, (x * scale, y * scale), r * scale)
+            pygame.draw.circle(surf, (20, 20, 20), (x * scale, y * scale), r * scale, edge)
+            continue
+        _, ax, ay, bx, by, r = shape
+        length = math.hypot(bx - ax, by - ay)
+        ox, oy = -(by - ay) / length * r, (bx - ax) / length * r
+        pygame.draw.polygon(surf, OBSTACLE_COLOR, [((ax + ox) * scale, (ay + oy) * scale),
+                                                   ((bx + ox) * scale, (by + oy) * scale),
+                                                   ((bx - ox) * scale, (by - oy) * scale),
+                                                   ((ax - ox) * scale, (ay - oy) * scale)])
+        pygame.draw.circle(surf, OBSTACLE_COLOR, (ax * scale, ay * scale), r * scale)
+        pygame.draw.circle(surf, OBSTACLE_COLOR, (bx * scale, by * scale), r * scale)
+
+
+_bullet_sprites = {}  # (pattern index, scale) -> sprite
+
+
+def bullet_sprite(kind, scale=1.0):
+    sprite = _bullet_sprites.get((kind, scale))
+    if sprite is None:
+        pattern = BULLET_PATTERNS[kind]
+        r = max(1, int(pattern["radius"] * scale + 0.5))
+        sprite = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, pattern["color"], (r, r), r)
+        pygame.draw.circle(sprite, (255, 255, 255), (r, r), max(1, r // 2))
+        _bullet_sprites[(kind, scale)] = sprite
+    return sprite
+
+
+def draw_bullets(surf, pool, scale=1.0):
+    """Pool bullets, one blits() batch per pattern sprite."""
+    for kind, xs, ys in pool.groups():
+        sprite = bullet_sprite(kind, scale)
+        half = sprite.get_width() // 2
+        xs = (xs * scale).astype(int) - half
+        ys = (ys * scale).astype(int) - half
+        surf.blits([(sprite, pos) for pos in zip(xs.tolist(), ys.tolist())], doreturn=False)
+
+
+def draw_hud(surf, match, status=None):
+    """Health bar and HUD text, always drawn at full resolution so they stay sharp."""
+    match.boss.draw_health_bar(surf)
+    for text, color, pos in hud_lines(match, status):
+        surf.blit(font.render(text, True, color), pos)
+
+
+def hud_lines(match, status=None):
+    """HUD text as (string, color, position) rows, shared by every renderer. status: e.g. the time scale."""
+    player, boss = match.player, match.boss
+    lines = [
+        (f"Player HP: {int(player.health)}", HUD_COLOR, (12, 12)),
+        (f"Boss HP: {int(boss.health)} / {boss.max_health}", HUD_COLOR, (SCREEN_W - 320, 12)),
+    ]
+
+    # Ammo / reload HUD - show per-bullet reload progress for player and boss
+    if player.reloading:
+        frac = clamp(1.0 - (player.reload_timer / PLAYER_RELOAD_PER_BULLET), 0.0, 1.0)
+        ammo_txt = f"Player reload: {player.ammo} / {player.max_ammo} ({frac*100:.0f}%)"
+    else:
+        ammo_txt = f"Ammo: {player.ammo} / {player.max_ammo}"
+    lines.append((ammo_txt, HUD_COLOR, (12, 36)))
+
+    # show boss ammo as well
+    if boss.reloading:
+        bfrac = clamp(1.0 - (boss.reload_timer / BOSS_RELOAD_PER_BULLET), 0.0, 1.0)
+        boss_ammo_txt = f"Boss reload: {boss.ammo} / {boss.max_ammo} ({bfrac*100:.0f}%)"
+    else:
+        boss_ammo_txt = f"Boss Ammo: {boss.ammo} / {boss.max_ammo}"
+    lines.append((boss_ammo_txt, HUD_COLOR, (12, 58)))
+
+    if player.charging:
+        lines.append((f"Charge: {int(player.charge * 100)}%", (210, 210, 210), (SCREEN_W - 120, 36)))
+
+    lines.append(("Press R to reload (manual). Shots consume more ammo when charged.", (120, 120, 120),
+                  (12, SCREEN_H - 28)))
+    if status:
+        lines.append((status, (240, 200, 60), (SCREEN_W - 120, 58)))
+    return lines
 
 def draw_button(surf, rect, text, highlight=False):
     color = (70, 70, 70) if not highlight else (120, 120, 120)
@@ -745,7 +4025,8 @@ def start_screen_loop():
     start_btn = pygame.Rect(SCREEN_W // 2 - 96, SCREEN_H - 120, 192, 58)
 
     while running:
-        mouse = pygame.mouse.get_pos()
+        if autopilot:
+            autopilot.ui_frame("start", [diff_rects[autopilot.played % len(diff_rects)], start_btn])
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return None
@@ -753,11 +4034,12 @@ def start_screen_loop():
                 return None
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 for i, r in enumerate(diff_rects):
-                    if r.collidepoint(mouse):
+                    if r.collidepoint(event.pos):
                         selected_idx = i
-                if start_btn.collidepoint(mouse):
+                if start_btn.collidepoint(event.pos):
                     return difficulties[selected_idx]
 
+        renderer.ui_frame()
         screen.fill(BACKGROUND_COLOR)
         title = title_font.render("TILTFIRE — BOSS TRAINING", True, (230, 230, 230))
         screen.blit(title, (SCREEN_W // 2 - title.get_width() // 2, 40))
@@ -790,102 +4072,154 @@ def start_screen_loop():
         footer = font.render("Press Esc to quit at any time", True, (120, 120, 120))
         screen.blit(footer, (SCREEN_W // 2 - footer.get_width() // 2, SCREEN_H - 40))
 
-        pygame.display.flip()
+        renderer.present_ui()
         clock.tick(FPS)
     return None
 
 
 def end_screen_return(result_text, frame_surface):
-    global last_frame_surface, restart_btn, quit_btn
-    last_frame_surface = frame_surface.copy()
     box_w, box_h = 640, 240
     bx = SCREEN_W // 2 - box_w // 2
     by = SCREEN_H // 2 - box_h // 2
     restart_btn = pygame.Rect(bx + 78, by + box_h - 86, 200, 56)
     quit_btn = pygame.Rect(bx + box_w - 78 - 200, by + box_h - 86, 200, 56)
+    backdrop = renderer.blurred(frame_surface, amt=8)
+    overlay = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
+    overlay.fill((8, 8, 8, 160))
+    rt = title_font.render(result_text, True, (220, 220, 220))
 
     while True:
-        mouse = pygame.mouse.get_pos()
+        if autopilot:
+            autopilot.ui_frame("end", [restart_btn])
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return "quit"
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 return "quit"
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if restart_btn.collidepoint(mouse):
+                if restart_btn.collidepoint(event.pos):
                     return "restart"
-                if quit_btn.collidepoint(mouse):
+                if quit_btn.collidepoint(event.pos):
                     return "quit"
 
-        blurred = blur_surface(last_frame_surface, amt=8)
-        screen.blit(blurred, (0, 0))
-        overlay = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
-        overlay.fill((8, 8, 8, 160))
+        renderer.ui_frame(backdrop)
         screen.blit(overlay, (0, 0))
 
         pygame.draw.rect(screen, (28, 28, 28), (bx, by, box_w, box_h), border_radius=12)
         pygame.draw.rect(screen, (20, 20, 20), (bx, by, box_w, box_h), width=2, border_radius=12)
 
-        rt = title_font.render(result_text, True, (220, 220, 220))
         screen.blit(rt, (SCREEN_W // 2 - rt.get_width() // 2, by + 28))
 
         draw_button(screen, restart_btn, "Restart", highlight=False)
         draw_button(screen, quit_btn, "Quit", highlight=False)
 
-        pygame.display.flip()
+        renderer.present_ui()
         clock.tick(FPS)
 
 
-def run_game():
+def time_scale_label(scale):
+    return "MAX" if scale == float("inf") else f"x{scale:g}"
+
+
+def handle_time_scale_key(event, stepper):
+    """[ and ] step through TIME_SCALES, backslash returns to 1x."""
+    if event.key == pygame.K_RIGHTBRACKET:
+        stepper.shift(1)
+    elif event.key == pygame.K_LEFTBRACKET:
+        stepper.shift(-1)
+    elif event.key == pygame.K_BACKSLASH:
+        stepper.scale = 1.0
+
+
+def present_match(match, aim, divider_flash_timer, stepper, tick_ms, scaler=None, effects=None, final=False):
+    """
+    Draws and presents the latest state after this frame's ticks, and feeds the
+    load governors the cost of a 1x frame (render plus one tick), so fast-forward
+    doesn't read as load.
+    """
     global last_frame_surface
+    render_start = time.perf_counter()
+    status = time_scale_label(stepper.scale) if stepper.scale != 1.0 else None
+    renderer.draw_match(match, aim, divider_flash_timer, status)
+    if frame_monitor:
+        frame_monitor.mark("draw")
+    if match.result or final:
+        last_frame_surface = renderer.snapshot()  # read back before present() swaps buffers
+    renderer.present()
+    audio.flush()
+    if frame_monitor:
+        frame_monitor.mark("present")
+    work_ms = (time.perf_counter() - render_start) * 1000.0 + tick_ms
+    if effects:
+        match.effects = effects.update(work_ms)
+    if scaler:
+        renderer.scale = scaler.update(work_ms)
+
+
+def run_game(recorder=None, policy=None, scaler=None, effects=None, replays=None, time_scale=1.0):
+    global last_frame_surface, ai_budget, planner_deterministic
     STATE_START = "START"
     STATE_PLAYING = "PLAYING"
     state = STATE_START
     chosen_difficulty = "Normal"
-
-    particles = []
-
-    def spawn_particles(pos, base_color, count=PARTICLE_COUNT_HIT):
-        for i in range(count):
-            dirv = Vector2(random.uniform(-1, 1), random.uniform(-1, 1))
-            if dirv.length_squared() < 1e-6:
-                dirv = Vector2(0, -1)
-            else:
-                dirv = dirv.normalize()
-            speed = random.uniform(80, 280)
-            vel = dirv * speed
-            life = random.uniform(PARTICLE_LIFE_MIN, PARTICLE_LIFE_MAX)
-            size = random.uniform(2, 6)
-            color = (
-                clamp(base_color[0] + random.randint(-30, 30), 80, 255),
-                clamp(base_color[1] + random.randint(-30, 30), 80, 255),
-                clamp(base_color[2] + random.randint(-30, 30), 80, 255),
-            )
-            particles.append(Particle(Vector2(pos), vel, life, color, size))
+    controls = PlayerControls()
+    stepper = SimStepper(time_scale)
+    played = 0
+    if replays:
+        # recorded matches must replay exactly from seed + controls: no wall-clock think budgets
+        ai_budget = AIBudget(float("inf"))
+        planner_deterministic = True
+
+    def tick():
+        inputs = autopilot.act(match) if autopilot else controls
+        match.step(TICK_DT, inputs)
+        if recorder:
+            recorder.record(TICK_DT, match.player, match.boss, match.projectiles, inputs.move, inputs.aim,
+                            match.fired)
+        if replays:
+            replays.record(inputs)
+        controls.clear_edges()  # edges stay pending until a tick consumes them (slow motion)
+        return match.result is None
 
     while True:
         if state == STATE_START:
+            if autopilot and autopilot.match_boundary():
+                return
             diff = start_screen_loop()
             if diff is None:
                 pygame.quit()
                 sys.exit()
             chosen_difficulty = diff
-            player = Player(Vector2(SCREEN_W // 2, CENTER_Y + (SCREEN_H - CENTER_Y) * 0.5), side="bottom")
-            boss = Boss(Vector2(SCREEN_W // 2, CENTER_Y * 0.5), difficulty=chosen_difficulty)
-            projectiles = []
+            match = Match(chosen_difficulty, seed=random.randrange(2 ** 31), policy=policy)
             divider_flash_timer = DIVIDER_FLASH_DURATION
+            telemetry.emit(TEV_MATCH_START, ACTOR_PLAYER, DIFFICULTIES.index(chosen_difficulty))
+            if autopilot:
+                autopilot.begin_match(match)
+            if recorder:
+                recorder.begin_match()
+            if replays:
+                replays.begin_match(match)
+            if checksum_log:
+                match.checksums = StateLog(numbered_path(checksum_log, played), {"live": played, "seed": match.seed,
+                                                                                 "difficulty": chosen_difficulty})
+                atexit.register(match.checksums.close)  # quitting mid-match still leaves a readable log
+            played += 1
+            controls.clear_edges()
+            stepper.reset()
+            gc_control.match_started()
+            if frame_monitor:
+                frame_monitor.reset()
             state = STATE_PLAYING
 
         elif state == STATE_PLAYING:
             playing = True
             while playing:
-                dt = clock.tick(FPS) / 1000.0
-                now = pygame.time.get_ticks() / 1000.0
-                if divider_flash_timer > 0:
-                    divider_flash_timer -= dt
-
+                frame_dt = clock.tick(FPS) / 1000.0
+                frame_start = time.perf_counter()
+                ai_budget.begin_frame()
+                if frame_monitor:
+                    frame_monitor.begin_frame()
 
-                raw_dir = Vector2(0, 0)
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         pygame.quit()
@@ -895,82 +4229,22 @@ def run_game():
                         sys.exit()
                     elif event.type == pygame.MOUSEBUTTONDOWN:
                         if event.button == 1:
-                            player.start_charge(now)
+                            controls.charge_pressed = True
                     elif event.type == pygame.MOUSEBUTTONUP:
                         if event.button == 1:
-                            charge_val = player.end_charge(now)
-                            if charge_val > 0.001 and player.health > 0:
-                                # determine how many bullets this charge wants to consume
-                                desired_slots = max(1, int(math.ceil(charge_val * player.max_ammo)))
-                                if desired_slots >= player.max_ammo:
-                                    desired_slots = player.max_ammo
-                                if player.ammo <= 0:
-                                    if empty_click_sound:
-                                        empty_click_sound.play()
-                                else:
-                                    # if not enough ammo, scale down the effective charge
-                                    bullets_used = min(desired_slots, player.ammo)
-                                    effective_charge = bullets_used / float(player.max_ammo)
-                                    mpos = Vector2(pygame.mouse.get_pos())
-                                    aim = (mpos - player.pos)
-                                    # spawn projectile and record shot immediately
-                                    proj = None
-                                    if effective_charge > 0:
-                                        proj = Projectile(player.pos + aim.normalize() * (player.radius + (MIN_PROJ_RADIUS + (MAX_PROJ_RADIUS - MIN_PROJ_RADIUS) * effective_charge) + 4),
-                                                          aim.normalize() * (MIN_PROJ_SPEED + (MAX_PROJ_SPEED - MIN_PROJ_SPEED) * effective_charge),
-                                                          MIN_PROJ_RADIUS + (MAX_PROJ_RADIUS - MIN_PROJ_RADIUS) * effective_charge,
-                                                          MIN_DAMAGE + (MAX_DAMAGE - MIN_DAMAGE) * effective_charge,
-                                                          owner_tag="player")
-                                    if proj:
-                                        projectiles.append(proj)
-                                        boss.record_player(player.pos, now, player_fired=True)
-                                        player.ammo -= bullets_used
-                                        player.record_shot(now)
-                                        if player_shot_sound:
-                                            player_shot_sound.play()
-                                        # start per-bullet reload if magazine empty
-                                        if player.ammo <= 0 and not player.reloading:
-                                            player.reloading = True
-                                            player.reload_timer = PLAYER_RELOAD_PER_BULLET
+                            controls.charge_released = True
                     elif event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_SPACE:
-                            player.start_charge(now)
+                            controls.charge_pressed = True
                         if event.key == pygame.K_r:
-                            if player.ammo < player.max_ammo and not player.reloading:
-                                player.start_reload()
+                            controls.reload = True
+                        handle_time_scale_key(event, stepper)
                     elif event.type == pygame.KEYUP:
                         if event.key == pygame.K_SPACE:
-                            charge_val = player.end_charge(now)
-                            if charge_val > 0.001 and player.health > 0:
-                                desired_slots = max(1, int(math.ceil(charge_val * player.max_ammo)))
-                                if desired_slots >= player.max_ammo:
-                                    desired_slots = player.max_ammo
-                                if player.ammo <= 0:
-                                    if empty_click_sound:
-                                        empty_click_sound.play()
-                                else:
-                                    bullets_used = min(desired_slots, player.ammo)
-                                    effective_charge = bullets_used / float(player.max_ammo)
-                                    mpos = Vector2(pygame.mouse.get_pos())
-                                    aim = (mpos - player.pos)
-                                    proj = None
-                                    if effective_charge > 0:
-                                        proj = Projectile(player.pos + aim.normalize() * (player.radius + (MIN_PROJ_RADIUS + (MAX_PROJ_RADIUS - MIN_PROJ_RADIUS) * effective_charge) + 4),
-                                                          aim.normalize() * (MIN_PROJ_SPEED + (MAX_PROJ_SPEED - MIN_PROJ_SPEED) * effective_charge),
-                                                          MIN_PROJ_RADIUS + (MAX_PROJ_RADIUS - MIN_PROJ_RADIUS) * effective_charge,
-                                                          MIN_DAMAGE + (MAX_DAMAGE - MIN_DAMAGE) * effective_charge,
-                                                          owner_tag="player")
-                                    if proj:
-                                        projectiles.append(proj)
-                                        boss.record_player(player.pos, now, player_fired=True)
-                                        player.ammo -= bullets_used
-                                        player.record_shot(now)
-                                        if player_shot_sound:
-                                            player_shot_sound.play()
-                                        if player.ammo <= 0 and not player.reloading:
-                                            player.reloading = True
-                                            player.reload_timer = PLAYER_RELOAD_PER_BULLET
+                            controls.charge_released = True
 
+                raw_dir = controls.move
+                raw_dir.x = raw_dir.y = 0
                 keys = pygame.key.get_pressed()
                 if keys[pygame.K_w]:
                     raw_dir.y -= 1
@@ -980,130 +4254,467 @@ def run_game():
                     raw_dir.x -= 1
                 if keys[pygame.K_d]:
                     raw_dir.x += 1
-
-                if player.charging:
-                    player.charge = clamp((now - player.charge_start_time) / CHARGE_DURATION, 0.0, 1.0)
-                else:
-                    player.charge = 0.0
-
-                player.update(dt, raw_dir)
-                boss.update(dt, player, projectiles, now)
-
-                for p in projectiles:
-                    p.update(dt)
-
-                # update particles
-                for part in particles:
-                    part.update(dt)
-                particles = [pt for pt in particles if pt.life > 0]
-
-                # collisions
-                for p in projectiles:
-                    if p.is_dead():
-                        continue
-                    if p.owner == "player":
-                        if circle_collide(p.pos, p.radius, boss.pos, boss.radius):
-                            p.hit = True
-                            boss.apply_hit(p.damage)
-                            spawn_particles(p.pos, (200, 120, 255), count=PARTICLE_COUNT_HIT)
-                            if hit_sound:
-                                hit_sound.play()
-                    elif p.owner == "boss":
-                        if circle_collide(p.pos, p.radius, player.pos, player.radius):
-                            p.hit = True
-                            player.apply_hit(p.damage)
-                            spawn_particles(p.pos, (255, 120, 80), count=PARTICLE_COUNT_HIT)
-                            if hit_sound:
-                                hit_sound.play()
-
-                projectiles = [p for p in projectiles if not p.is_dead()]
-
-                screen.fill(BACKGROUND_COLOR)
+                controls.aim = Vector2(pygame.mouse.get_pos())
+                if frame_monitor:
+                    frame_monitor.mark("input")
+
+                ticks = stepper.run(frame_dt, tick)
+                if frame_monitor:
+                    frame_monitor.mark("sim")
+                tick_ms = (time.perf_counter() - frame_start) * 1000.0 / max(1, ticks)
                 if divider_flash_timer > 0:
-                    phase = int(divider_flash_timer * DIVIDER_FLASH_FREQ) % 2
-                    if phase == 0:
-                        pygame.draw.line(
-                            screen,
-                            DIVIDER_COLOR,
-                            (0, CENTER_Y),
-                            (SCREEN_W, CENTER_Y),
-                            DIVIDER_THICKNESS
-                        )
-
-                for p in projectiles:
-                    p.draw(screen)
-
-                boss.draw(screen)
-                boss.draw_health_bar(screen)
-
-                mpos = Vector2(pygame.mouse.get_pos())
-                aim_dir = mpos - player.pos
-                player.draw(screen, aim_dir, player.charge)
-
-                # draw particles (above player/boss for nice effect)
-                for part in particles:
-                    part.draw(screen)
-
-                if player.hit_timer > 0:
-                    s = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
-                    alpha = int(180 * (player.hit_timer / HIT_FLASH_TIME))
-                    s.fill((PLAYER_HIT_TINT[0], PLAYER_HIT_TINT[1], PLAYER_HIT_TINT[2], alpha))
-                    screen.blit(s, (0, 0))
-
-                # HUD: show player health clearly
-                text = font.render(f"Player HP: {int(player.health)}", True, HUD_COLOR)
-                screen.blit(text, (12, 12))
-                boss_text = font.render(f"Boss HP: {int(boss.health)} / {boss.max_health}", True, HUD_COLOR)
-                screen.blit(boss_text, (SCREEN_W - 320, 12))
-
-                # Ammo / reload HUD - show per-bullet reload progress for player and boss
-                if player.reloading:
-                    frac = clamp(1.0 - (player.reload_timer / PLAYER_RELOAD_PER_BULLET), 0.0, 1.0)
-                    ammo_txt = f"Player reload: {player.ammo} / {player.max_ammo} ({frac*100:.0f}%)"
-                else:
-                    ammo_txt = f"Ammo: {player.ammo} / {player.max_ammo}"
-                ammo_surface = font.render(ammo_txt, True, HUD_COLOR)
-                screen.blit(ammo_surface, (12, 36))
-
-                # show boss ammo as well
-                if boss.reloading:
-                    bfrac = clamp(1.0 - (boss.reload_timer / BOSS_RELOAD_PER_BULLET), 0.0, 1.0)
-                    boss_ammo_txt = f"Boss reload: {boss.ammo} / {boss.max_ammo} ({bfrac*100:.0f}%)"
-                else:
-                    boss_ammo_txt = f"Boss Ammo: {boss.ammo} / {boss.max_ammo}"
-                boss_ammo_surface = font.render(boss_ammo_txt, True, HUD_COLOR)
-                screen.blit(boss_ammo_surface, (12, 58))
-
-                if player.charging:
-                    cp = int(player.charge * 100)
-                    t = font.render(f"Charge: {cp}%", True, (210, 210, 210))
-                    screen.blit(t, (SCREEN_W - 120, 36))
-
-                hint = font.render("Press R to reload (manual). Shots consume more ammo when charged.", True, (120, 120, 120))
-                screen.blit(hint, (12, SCREEN_H - 28))
-
-                pygame.display.flip()
-
-                if boss.health <= 0:
-                    result = "Victory! You defeated the Boss."
-                    last_frame_surface = screen.copy()
-                    res = end_screen_return(result, last_frame_surface)
-                    if res == "restart":
-                        state = "START"
-                    else:
-                        pygame.quit()
-                        sys.exit()
-                    playing = False
-                elif player.health <= 0:
-                    result = "Defeat — You were defeated by the Boss."
-                    last_frame_surface = screen.copy()
-                    res = end_screen_return(result, last_frame_surface)
-                    if res == "restart":
+                    divider_flash_timer -= ticks * TICK_DT
+                aim = autopilot.bot.controls.aim if autopilot else controls.aim
+                present_match(match, aim, divider_flash_timer, stepper, tick_ms, scaler, effects)
+
+                if match.result:
+                    player, boss = match.player, match.boss
+                    telemetry.emit(TEV_MATCH_END, ACTOR_PLAYER, 1.0 if boss.health <= 0 else 0.0,
+                                   player.health, boss.health)
+                    if replays:
+                        replays.end_match(match)
+                    if match.checksums:
+                        match.checksums.close()
+                        atexit.unregister(match.checksums.close)
+                    gc_control.match_ended()
+                    if end_of_match(match) == "restart":
                         state = "START"
+                        match = player = boss = None  # nothing of the finished match lives through the menus
                     else:
                         pygame.quit()
                         sys.exit()
                     playing = False
 
+
+def end_of_match(match):
+    global last_frame_surface
+    if match.boss.health <= 0:
+        result = "Victory! You defeated the Boss."
+    elif match.player.health <= 0:
+        result = "Defeat — You were defeated by the Boss."
+    else:
+        result = "Replay ended."
+    # hand the frame over so a screen-sized surface isn't kept alive through the next match
+    frame, last_frame_surface = last_frame_surface, None
+    return end_screen_return(result, frame)
+
+
+def play_replay(path, scaler=None, effects=None, time_scale=1.0):
+    """Plays a replay file in the window. Speed keys work as in a live match; Restart replays it again."""
+    global ai_budget, planner_deterministic
+    header, ticks = load_replay(path)
+    ai_budget = AIBudget(float("inf"))
+    planner_deterministic = True
+    stepper = SimStepper(time_scale)
+    while True:
+        match = replay_match(header)
+        divider_flash_timer = DIVIDER_FLASH_DURATION
+        gc_control.match_started()
+        if frame_monitor:
+            frame_monitor.reset()
+
+        def tick():
+            match.step(TICK_DT, ticks[match.tick])
+            return match.result is None and match.tick < len(ticks)
+
+        while match.result is None and match.tick < len(ticks):
+            frame_dt = clock.tick(FPS) / 1000.0
+            frame_start = time.perf_counter()
+            if frame_monitor:
+                frame_monitor.begin_frame()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    return
+                if event.type == pygame.KEYDOWN:
+                    handle_time_scale_key(event, stepper)
+            if frame_monitor:
+                frame_monitor.mark("input")
+            n = stepper.run(frame_dt, tick)
+            if frame_monitor:
+                frame_monitor.mark("sim")
+            tick_ms = (time.perf_counter() - frame_start) * 1000.0 / max(1, n)
+            if divider_flash_timer > 0:
+                divider_flash_timer -= n * TICK_DT
+            aim = ticks[match.tick - 1].aim if match.tick else Vector2(SCREEN_W // 2, 0)
+            present_match(match, aim, divider_flash_timer, stepper, tick_ms, scaler, effects,
+                          final=match.tick >= len(ticks))
+        gc_control.match_ended()
+        if end_of_match(match) != "restart":
+            return
+        stepper.reset()
+
+
+
+# ---------- Soak mode ----------
+def rss_bytes():
+    """Current resident set size (Linux /proc); peak RSS from getrusage elsewhere, 0 if neither exists."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def slope(values):
+    """Least-squares growth per sample."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2.0
+    mean_y = sum(values) / n
+    num = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    return num / sum((i - mean_x) ** 2 for i in range(n))
+
+
+class SoakPilot:
+    """
+    Runs the real game flow unattended for --soak. Menu clicks are posted to the
+    SDL event queue after each screen has drawn a few frames, cycling through the
+    difficulties; matches are played by a ScriptedPlayer. Every return to the start
+    screen is a match boundary: the previous samples are dropped and the collector
+    runs, then RSS, tracemalloc's traced total and live object counts per type are
+    sampled. RSS and traced bytes are judged as least-squares slopes over the
+    boundaries after SOAK_WARMUP_MATCHES, object counts as growth from the end of
+    warm-up to the last boundary; no verdict is given before SOAK_MIN_MEASURED
+    matches have been measured. Traces allocated under the pilot's own frames are
+    filtered out of the snapshots and samples go into preallocated arrays, so the
+    soak doesn't measure its own bookkeeping.
+    """
+
+    def __init__(self, matches, seed=0, log=print):
+        import tracemalloc, inspect
+        self.tracemalloc = tracemalloc
+        self.matches = matches
+        self.warmup = SOAK_WARMUP_MATCHES
+        self.rng = random.Random(seed)
+        self.log = log
+        self.bot = None
+        self.screen = None
+        self.screen_frames = 0
+        self.played = 0
+        self.rss = array.array("d", bytes(8 * (matches + 1)))
+        self.traced = array.array("d", bytes(8 * (matches + 1)))
+        # traces with the pilot or tracemalloc anywhere in their stack are its own bookkeeping
+        source, first = inspect.getsourcelines(SoakPilot)
+        self.filters = [tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True)]
+        self.filters += [tracemalloc.Filter(False, __file__, line, all_frames=True)
+                         for line in range(first, first + len(source))]
+        self.baseline = None      # filtered snapshot at the end of warm-up
+        self.snapshot = None      # ... and at the latest boundary
+        self.warm_counts = None   # live objects by type at the end of warm-up
+        self.counts = None        # ... and at the latest boundary
+        self.started = time.perf_counter()
+        tracemalloc.start(SOAK_TRACE_FRAMES)
+
+    def ui_frame(self, screen, buttons):
+        """Called once per menu frame; clicks `buttons` in order on the SOAK_UI_FRAMES-th frame."""
+        if screen != self.screen:
+            self.screen, self.screen_frames = screen, 0
+        self.screen_frames += 1
+        if self.screen_frames == SOAK_UI_FRAMES:
+            for rect in buttons:
+                pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=rect.center))
+                pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONUP, button=1, pos=rect.center))
+
+    def begin_match(self, match):
+        self.screen = "match"
+        self.bot = ScriptedPlayer(self.rng.uniform(0.2, 0.9), seed=self.rng.randrange(2 ** 31))
+
+    def act(self, match):
+        return self.bot.act(match, TICK_DT)
+
+    def match_boundary(self):
+        """Samples memory; True once every match has been played."""
+        i = self.played
+        self.bot = None
+        self.snapshot = self.counts = None
+        gc.collect()
+        self.rss[i] = rss_bytes()
+        own = self.own_objects()
+        self.counts = collections.Counter(type(o).__name__ for o in gc.get_objects() if id(o) not in own)
+        self.snapshot = self.tracemalloc.take_snapshot().filter_traces(self.filters)
+        self.traced[i] = sum(stat.size for stat in self.snapshot.statistics("filename"))
+        if i == self.warmup:
+            self.baseline, self.warm_counts = self.snapshot, self.counts
+        if self.log and i and i % 50 == 0:
+            self.log(f"soak: {i}/{self.matches} matches  rss {self.rss[i] / 2 ** 20:.1f} MiB  "
+                     f"traced {self.traced[i] / 2 ** 20:.2f} MiB  {time.perf_counter() - self.started:.0f} s")
+        self.played += 1
+        return self.played > self.matches
+
+    def own_objects(self):
+        """ids of the samples the pilot holds across boundaries, left out of the object counts."""
+        if self.baseline is None:
+            return set()
+        traces = self.baseline.traces
+        return {id(self.warm_counts), id(self.baseline), id(traces), id(traces._traces)}
+
+    def report(self):
+        """
+        (passed, text) comparing the boundaries after warm-up; passed is None when fewer
+        than SOAK_MIN_MEASURED matches were measured, as the slopes would mean nothing.
+        """
+        played = self.played - 1
+        span = played - self.warmup
+        if span < SOAK_MIN_MEASURED:
+            return None, (f"soak: {max(played, 0)} matches, {SOAK_WARMUP_MATCHES} warm-up + "
+                          f"{SOAK_MIN_MEASURED} measured needed\nINCONCLUSIVE: too few matches measured")
+        diff = self.snapshot.compare_to(self.baseline, "lineno")
+        rss = self.rss[self.warmup:self.played]
+        traced = self.traced[self.warmup:self.played]
+        rss_slope, traced_slope = slope(rss), slope(traced)
+        growth = sorted((((self.counts[t] - self.warm_counts[t]) / span, t)
+                         for t in self.counts | self.warm_counts), reverse=True)
+        leaking = [t for g, t in growth if g > SOAK_MAX_OBJECT_GROWTH]
+        passed = (rss_slope <= SOAK_MAX_RSS_GROWTH and traced_slope <= SOAK_MAX_TRACED_GROWTH
+                  and not leaking)
+        lines = [
+            f"soak: {played} matches in {time.perf_counter() - self.started:.0f} s, "
+            f"measured over {span} after {self.warmup} warm-up",
+            f"rss: {rss[0] / 2 ** 20:.1f} -> {rss[-1] / 2 ** 20:.1f} MiB, "
+            f"slope {rss_slope / 1024:.2f} KiB/match (limit {SOAK_MAX_RSS_GROWTH / 1024:.0f})",
+            f"traced: {traced[0] / 2 ** 20:.2f} -> {traced[-1] / 2 ** 20:.2f} MiB, "
+            f"slope {traced_slope:.0f} B/match (limit {SOAK_MAX_TRACED_GROWTH})",
+            "live objects (end of warm-up -> last boundary, growth per match):",
+        ]
+        for g, t in growth[:SOAK_REPORT_TOP]:
+            lines.append(f"  {t:<28}{self.warm_counts[t]:>9} ->{self.counts[t]:>9}  {g:+.3f}"
+                         f"{'  LEAK' if g > SOAK_MAX_OBJECT_GROWTH else ''}")
+        lines.append("top allocation growth since warm-up:")
+        for stat in diff[:SOAK_REPORT_TOP]:
+            lines.append(f"  {stat}")
+        lines.append("PASS" if passed else "FAIL: memory grows across matches")
+        return passed, "\n".join(lines)
+
+
+# set from --soak; run_game and the menus take their input from it when present
+autopilot = None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TILTFIRE — 1v1 arena shooter")
+    parser.add_argument("--telemetry-dir", default=os.environ.get("TILTFIRE_TELEMETRY_DIR"),
+                        help="record gameplay events to rotating files in this directory "
+                             "(also settable via TILTFIRE_TELEMETRY_DIR)")
+    parser.add_argument("--record-dataset", metavar="DIR",
+                        help="record per-tick state/action columns for imitation learning")
+    parser.add_argument("--boss-policy", metavar="WEIGHTS",
+                        help="drive the boss with an MLP policy loaded from an .npz "
+                             "('random' uses untrained weights, for benchmarking)")
+    parser.add_argument("--headless", type=int, metavar="ARENAS",
+                        help="run this many arenas without a display against scripted players and report timing")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default="Normal",
+                        help="difficulty for headless runs")
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated seconds for headless runs")
+    parser.add_argument("--personality", choices=["Sniper", "Brawler", "Trickster", "Adaptive", "Planner"],
+                        help="force the boss personality in headless runs")
+    parser.add_argument("--planner-workers", type=int, default=0,
+                        help="evaluate Planner rollouts on a pool of this many workers instead of inline")
+    parser.add_argument("--planner-pool", choices=["thread", "process"], default="thread")
+    parser.add_argument("--think-hz", type=float, default=BOSS_THINK_HZ,
+                        help="boss decision rate (0 = every frame); movement is still integrated every frame")
+    parser.add_argument("--arena", choices=list(ARENA_LAYOUTS), default=ARENA_LAYOUT,
+                        help="obstacle layout for live, headless and soak matches")
+    parser.add_argument("--renderer", choices=["surface", "texture", "texture-software"], default=RENDER_BACKEND,
+                        help="drawing backend: software surfaces, or pygame._sdl2 textures "
+                             "(texture-software forces SDL's software renderer)")
+    parser.add_argument("--dynamic-resolution", action="store_true",
+                        help="render the arena at a lower resolution when frames run over the FPS budget")
+    parser.add_argument("--time-scale", choices=["0.25", "0.5", "1", "2", "8", "max"], default="1",
+                        help="starting simulation speed; [ and ] change it in game, \\ resets to 1x")
+    parser.add_argument("--record-replays", metavar="DIR", help="save every match as a replay file in DIR")
+    parser.add_argument("--replay", metavar="FILE", help="play back a replay file")
+    parser.add_argument("--check-replay", metavar="FILE",
+                        help="re-simulate a replay headlessly at full speed, print the outcome and exit "
+                             "(1 if the boss personality or the recorded outcome differs)")
+    parser.add_argument("--checksum-log", metavar="FILE",
+                        help="log per-tick state checksums, to compare runs with --bisect-checksums: the replay's "
+                             "with --check-replay, each arena's with --headless and each match's in live play "
+                             "(arena/match N > 0 goes to FILE-N)")
+    parser.add_argument("--bisect-checksums", nargs=2, metavar=("LOG_A", "LOG_B"),
+                        help="report the first tick where two checksum logs diverge and the differing fields; "
+                             "exits 1 if they do")
+    parser.add_argument("--export", metavar="REPLAY", help="render a replay offline to frames and exit")
+    parser.add_argument("--export-out", default="frames",
+                        help="PNG directory, or the raw RGB24 stream file ('-' = stdout) with --export-format raw")
+    parser.add_argument("--export-format", choices=["png", "raw"], default="png")
+    parser.add_argument("--export-fps", type=float, default=EXPORT_FPS)
+    parser.add_argument("--export-size", default=f"{SCREEN_W}x{SCREEN_H}", metavar="WxH")
+    parser.add_argument("--export-workers", type=int, help="process pool size (default: CPU count, 0 = inline)")
+    parser.add_argument("--gc", choices=["default", "managed"], default="default",
+                        help="managed: freeze setup objects and hold cyclic GC until menus/end screens")
+    parser.add_argument("--stutter-log", action="store_true",
+                        help="log frames over budget with their likely cause and print frame-time "
+                             "percentiles on exit")
+    parser.add_argument("--full-effects", action="store_true",
+                        help="keep particles, glows and hit flashes at full quality even when frames run long")
+    parser.add_argument("--scaled", action="store_true",
+                        help="resizable window scaled by SDL (surface renderer)")
+    parser.add_argument("--fullscreen", action="store_true", help="scaled fullscreen (surface renderer)")
+    parser.add_argument("--tuning", metavar="JSON",
+                        help="load difficulty/personality overrides written by --tune-out")
+    parser.add_argument("--tune", choices=DIFFICULTIES, action="append", metavar="DIFFICULTY",
+                        help="search boss parameters for this difficulty (repeatable) against TUNER_TARGETS and exit")
+    parser.add_argument("--tune-keys", help="comma-separated Row.key parameters to search "
+                                            "(default: the tuned difficulties' multipliers)")
+    parser.add_argument("--tune-iterations", type=int, default=12)
+    parser.add_argument("--tune-population", type=int, default=8)
+    parser.add_argument("--tune-seeds", type=int, default=16, help="matches per skill level per candidate")
+    parser.add_argument("--tune-workers", type=int, help="process pool size (default: CPU count, 0 = inline)")
+    parser.add_argument("--tune-cache", default="tuning_cache.jsonl", help="on-disk match result cache")
+    parser.add_argument("--tune-out", metavar="JSON", help="write the best overrides here")
+    parser.add_argument("--soak", type=int, metavar="MATCHES",
+                        help="play this many matches unattended through the menus under the dummy video "
+                             "driver, sampling memory at each match boundary; exits 1 if it grows")
+    parser.add_argument("--check-allocs", action="store_true",
+                        help="measure per-tick allocations of the simulation under tracemalloc and exit")
+    parser.add_argument("--bench-bullet-hell", action="store_true",
+                        help="time the bullet-hell phase (simulation, player collisions and software drawing) "
+                             "for --seconds at --difficulty (and --boss-policy); exits 1 if p99 frame time misses "
+                             "the FPS budget, fewer than BULLET_BENCH_MIN_RATE bullets/s were spawned or the boss "
+                             "stopped re-planning")
+    parser.add_argument("--bench-stress", type=float, default=BULLET_BENCH_STRESS,
+                        help="pattern rate (1.0 = Hard) the boss runs at in --bench-bullet-hell")
+    parser.add_argument("--check-ai-lod", type=int, metavar="MATCHES",
+                        help="equivalence-test think-every-frame vs --think-hz (with and without a tight think "
+                             "budget) over this many headless matches and exit")
+    args = parser.parse_args(argv)
+    if args.soak and args.soak < SOAK_WARMUP_MATCHES + SOAK_MIN_MEASURED:
+        parser.error(f"--soak needs at least {SOAK_WARMUP_MATCHES + SOAK_MIN_MEASURED} matches "
+                     f"({SOAK_WARMUP_MATCHES} warm-up + {SOAK_MIN_MEASURED} measured)")
+    return args
+
+
+def load_policy(spec):
+    if not spec:
+        return None
+    if spec == "random":
+        return MLPBossPolicy.random_init(seed=0)
+    return MLPBossPolicy.load(spec)
+
+
 if __name__ == "__main__":
-    run_game()
+    args = parse_args()
+    if args.telemetry_dir:
+        telemetry.start(args.telemetry_dir)
+    BOSS_THINK_HZ = args.think_hz
+    ARENA_LAYOUT = args.arena
+    if args.tuning:
+        with open(args.tuning) as fh:
+            apply_tuning(json.load(fh))
+    policy = load_policy(args.boss_policy)
+    if args.planner_workers > 0:
+        import concurrent.futures
+        pool_cls = (concurrent.futures.ProcessPoolExecutor if args.planner_pool == "process"
+                    else concurrent.futures.ThreadPoolExecutor)
+        planner_executor = pool_cls(max_workers=args.planner_workers)
+    if args.tune:
+        best, err, cache = tune_parameters(args.tune, args.tune_keys.split(",") if args.tune_keys else None,
+                                           args.tune_iterations, args.tune_population, args.tune_seeds,
+                                           cache_path=args.tune_cache, workers=args.tune_workers,
+                                           think_hz=args.think_hz)
+        print(f"best error {err:.4f}")
+        print(json.dumps(best, indent=2, sort_keys=True))
+        if args.tune_out:
+            with open(args.tune_out, "w") as fh:
+                json.dump(best, fh, indent=2, sort_keys=True)
+        sys.exit()
+    if args.check_replay:
+        t0 = time.perf_counter()
+        match = simulate_replay(args.check_replay, args.checksum_log)
+        print(f"result: {match.result or 'unfinished'}  ticks: {match.tick}  sim seconds: {match.now:.1f}  "
+              f"player hp: {match.player.health:.1f}  boss hp: {match.boss.health:.1f}  "
+              f"boss: {match.boss.personality}  wall seconds: {time.perf_counter() - t0:.2f}")
+        mismatches = replay_mismatches(load_replay(args.check_replay)[0], match)
+        for what, recorded, replayed in mismatches:
+            print(f"MISMATCH {what}: recorded {recorded!r}, replayed {replayed!r}")
+        sys.exit(1 if mismatches else 0)
+    if args.bisect_checksums:
+        tick, diffs, (len_a, len_b) = bisect_state_logs(*args.bisect_checksums)
+        if tick is None:
+            print(f"identical for {min(len_a, len_b)} ticks"
+                  + (f" (lengths differ: {len_a} vs {len_b} ticks)" if len_a != len_b else ""))
+            sys.exit(0 if len_a == len_b else 1)
+        print(f"first divergence at tick {tick} (identical for {tick - 1} ticks)")
+        for name, va, vb in diffs:
+            print(f"  {name:<28}{va!r:>24}  vs {vb!r}")
+        sys.exit(1)
+    if args.export:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"  # pool workers start without a window
+        size = tuple(int(v) for v in args.export_size.lower().split("x"))
+        t0 = time.perf_counter()
+        # progress goes to stderr so a raw stream on stdout stays clean
+        n = export_replay(args.export, args.export_out, args.export_format, args.export_fps, size,
+                          args.export_workers, log=lambda msg: print(msg, file=sys.stderr))
+        print(f"exported {n} frames in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+        sys.exit()
+    if args.check_allocs:
+        median, retained = measure_tick_allocations()
+        print(f"median transient bytes/tick: {median}  net retained bytes/tick: {retained:.1f}")
+        sys.exit(0 if median <= 256 and retained <= 64 else 1)
+    if args.bench_bullet_hell:
+        stats = bullet_hell_benchmark(args.seconds, args.difficulty, stress=args.bench_stress, policy=policy)
+        budget = 1000.0 / FPS
+        print(f"frames: {stats['frames']}  bullets live: {stats['live_mean']:.0f} mean / {stats['live_max']} max  "
+              f"spawned: {stats['spawned_per_s']:.0f}/s (floor {BULLET_BENCH_MIN_RATE:.0f})  "
+              f"player hits: {stats['hits']}  dropped: {stats['dropped']}")
+        print(f"sim ms p50 {stats['sim_p50']:.2f}  p99 {stats['sim_p99']:.2f}   "
+              f"frame ms p50 {stats['frame_p50']:.2f}  p99 {stats['frame_p99']:.2f}  max {stats['frame_max']:.2f}  "
+              f"(budget {budget:.2f})")
+        print(f"boss re-plans: {stats['replans_per_s']:.1f}/s (floor {BULLET_BENCH_MIN_REPLANS:.1f})")
+        sys.exit(0 if stats["frame_p99"] <= budget and stats["spawned_per_s"] >= BULLET_BENCH_MIN_RATE
+                 and stats["replans_per_s"] >= BULLET_BENCH_MIN_REPLANS else 1)
+    if args.check_ai_lod:
+        passed, rows, deferred = ai_lod_equivalence(args.check_ai_lod, args.think_hz, args.seconds, args.difficulty)
+        print(f"{'run':<8}{'metric':<18}{'every tick':>12}{'LOD':>12}{'90% CI of difference':>24}{'margin':>9}")
+        for run, name, a, b, lo, hi, margin, ok in rows:
+            print(f"{run:<8}{name:<18}{a:>12.2f}{b:>12.2f}{lo:>+12.3f} ..{hi:>+9.3f}{margin:>9.2f}"
+                  f"{'' if ok else '  NOT EQUIVALENT'}")
+        print(f"budget run: {deferred} thinks deferred at {AI_LOD_BUDGET_MS} ms per {AI_LOD_BATCH} arenas"
+              f"{'' if deferred else ' (budget never bound: FAIL)'}")
+        sys.exit(0 if passed else 1)
+    if args.headless:
+        _, stats = run_headless_batch(args.headless, args.seconds, args.difficulty, policy=policy,
+                                      personality=args.personality, checksum_log=args.checksum_log)
+        for key, value in stats.items():
+            print(f"{key}: {value}")
+        sys.exit()
+    flags = 0
+    if args.scaled or args.fullscreen:
+        flags |= pygame.SCALED | pygame.RESIZABLE
+    if args.fullscreen:
+        flags |= pygame.FULLSCREEN
+    gc_control = GCController(args.gc)
+    checksum_log = args.checksum_log
+    if args.stutter_log:
+        frame_monitor = FrameMonitor()
+        atexit.register(lambda: print(frame_monitor.report()))
+    if args.soak:
+        if os.environ.get("SDL_VIDEODRIVER") != "dummy":
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            pygame.display.quit()
+            pygame.display.init()
+        autopilot = SoakPilot(args.soak)
+        args.time_scale = "max"
+    init_display(args.renderer, flags)
+    time_scale = float("inf") if args.time_scale == "max" else float(args.time_scale)
+    scaler = ResolutionScaler() if args.dynamic_resolution else None
+    effects = None if args.full_effects else EffectsGovernor()
+    if args.replay:
+        play_replay(args.replay, scaler, effects, time_scale)
+        pygame.quit()
+        sys.exit()
+    run_game(recorder=DatasetRecorder(args.record_dataset) if args.record_dataset else None, policy=policy,
+             scaler=scaler, effects=effects,
+             replays=ReplayRecorder(args.record_replays, args.boss_policy) if args.record_replays else None,
+             time_scale=time_scale)
+    if autopilot:
+        passed, text = autopilot.report()
+        print(text)
+        pygame.quit()
+        sys.exit(2 if passed is None else 0 if passed else 1)